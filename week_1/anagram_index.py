@@ -0,0 +1,149 @@
+import itertools
+import os
+import pickle
+import sys
+from collections import Counter
+import numpy as np
+from dictionary import load_words
+
+# Lexicon index keyed by letter multisets.
+#   signature     the sorted letters of a word, all anagrams share one signature
+#   count vector  nr of times every letter of the alphabet occurs in a signature
+#   letter mask   64 bit mask of the letters in a signature, a cheap pre-filter
+# The signatures are grouped by length and every group keeps its count vectors and masks
+# in NumPy arrays, so containment queries run vectorised over one length group only.
+
+EXTENSION = '.anagrams.pkl'
+VERSION = 2 # stored indexes of another version are rebuilt
+
+# enumerate sub-multisets of the tiles when there are at most this many, otherwise
+# compare the tiles against the count vectors of every length group
+MAX_SUBSETS = 4096
+
+def signature(word):
+    return ''.join(sorted(word.lower()))
+
+class AnagramIndex:
+
+    def __init__(self, words):
+        self.version = VERSION
+        self.anagrams = {}
+        for word in words:
+            self.anagrams.setdefault(signature(word), []).append(word)
+
+        letters = sorted(set(itertools.chain.from_iterable(self.anagrams)))
+        self.alphabet = {letter: i for i, letter in enumerate(letters)}
+
+        # length -> (signatures, letter masks, count vectors)
+        groups = {}
+        for sig in self.anagrams:
+            groups.setdefault(len(sig), []).append(sig)
+        self.by_length = {}
+        for length, sigs in groups.items():
+            masks = np.array([self.mask(sig) for sig in sigs], dtype=np.uint64)
+            counts = np.array([self.counts(sig) for sig in sigs], dtype=np.uint8)
+            self.by_length[length] = (sigs, masks, counts)
+
+    def mask(self, letters):
+        mask = 0
+        for letter in letters:
+            mask |= 1 << (self.alphabet.get(letter, 0) % 64)
+        return mask
+
+    def counts(self, letters):
+        vector = np.zeros(len(self.alphabet), dtype=np.uint8)
+        for letter, count in Counter(letters).items():
+            if letter in self.alphabet:
+                vector[self.alphabet[letter]] = min(count, 255)
+        return vector
+
+    def anagrams_of(self, word):
+        # all words with exactly the letters of word (including word itself)
+        return list(self.anagrams.get(signature(word), []))
+
+    def longest_formable(self, tiles):
+        # the longest words that can be formed with (a subset of) the tiles, every tile
+        # used at most once
+        tiles = tiles.lower()
+        tile_counts = Counter(tiles)
+        if np.prod([count + 1 for count in tile_counts.values()]) <= MAX_SUBSETS:
+            return self.longest_by_subsets(tile_counts)
+
+        available = self.counts(tiles)
+        for length in sorted(self.by_length, reverse=True):
+            if length > len(tiles):
+                continue
+            sigs, masks, counts = self.by_length[length]
+            fits = np.all(counts <= available, axis=1)
+            if fits.any():
+                return sorted(word for i in np.flatnonzero(fits) for word in self.anagrams[sigs[i]])
+        return []
+
+    def longest_by_subsets(self, tile_counts):
+        # look up every sub-multiset of the tiles in the signature table, longest first
+        letters = sorted(tile_counts)
+        by_size = {}
+        for combination in itertools.product(*(range(tile_counts[letter] + 1) for letter in letters)):
+            sig = ''.join(letter * n for letter, n in zip(letters, combination))
+            if sig in self.anagrams:
+                by_size.setdefault(len(sig), []).extend(self.anagrams[sig])
+        if not by_size:
+            return []
+        return sorted(by_size[max(by_size)])
+
+    def words_with(self, length, letters):
+        # all words of the given length that contain the letters (as a multiset)
+        if length not in self.by_length:
+            return []
+        if any(letter not in self.alphabet for letter in letters.lower()):
+            return []
+        sigs, masks, counts = self.by_length[length]
+        need_mask = np.uint64(self.mask(letters.lower()))
+        candidates = np.flatnonzero((masks & need_mask) == need_mask)
+        need = self.counts(letters.lower())
+        fits = candidates[np.all(counts[candidates] >= need, axis=1)]
+        return sorted(word for i in fits for word in self.anagrams[sigs[i]])
+
+    def save(self, path):
+        # only the plain tables are pickled, not the class, so the file loads from any module
+        tmp = '{}.{}.tmp'.format(path, os.getpid())
+        with open(tmp, 'wb') as file:
+            pickle.dump(self.__dict__, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+    @staticmethod
+    def load(path):
+        index = AnagramIndex.__new__(AnagramIndex)
+        with open(path, 'rb') as file:
+            index.__dict__.update(pickle.load(file))
+        return index
+
+def load_index(path):
+    # Load the anagram index of a word list. It is built once and stored next to the
+    # word list as <name>.anagrams.pkl, and rebuilt when the word list is newer or the
+    # index was stored by another version.
+    target = os.path.splitext(path)[0] + EXTENSION
+    if os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(path):
+        index = AnagramIndex.load(target)
+        if getattr(index, 'version', None) == VERSION:
+            return index
+    index = AnagramIndex(load_words(path))
+    try:
+        index.save(target)
+    except OSError:
+        pass
+    return index
+
+if __name__ == '__main__':
+    # usage: python anagram_index.py anagrams <word>
+    #        python anagram_index.py longest <tiles>
+    #        python anagram_index.py contains <length> <letters>
+    index = load_index('words_NL.txt')
+    if len(sys.argv) == 3 and sys.argv[1] == 'anagrams':
+        print(index.anagrams_of(sys.argv[2]))
+    elif len(sys.argv) == 3 and sys.argv[1] == 'longest':
+        print(index.longest_formable(sys.argv[2]))
+    elif len(sys.argv) == 4 and sys.argv[1] == 'contains':
+        print(index.words_with(int(sys.argv[2]), sys.argv[3]))
+    else:
+        print('usage: python anagram_index.py anagrams <word> | longest <tiles> | contains <length> <letters>')
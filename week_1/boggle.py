@@ -1,22 +1,80 @@
+import argparse
+import functools
+import itertools
+import multiprocessing
+import os
 import random
-import codecs
 import string
+import sys
+import time
+from collections import deque
+from dictionary import load_words
 
-words = []
-board = []
 boardSize = 4
-found_words = []
-
-with codecs.open('words_NL.txt', 'r', encoding='utf-8', errors='ignore') as file:
-   for line in file:
-      for word in line.split():
-         words.append(word)
-
-for i in range(boardSize):
-   row = []
-   for r in range(boardSize):
-      row.append(random.choice(string.ascii_lowercase))
-   board.append(row)
+DICTIONARY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'words_NL.txt')
+
+class Trie:
+   # prefix tree over the word list, built once so that prefix and membership checks
+   # cost O(len(word)) instead of a scan over the whole dictionary
+   # every node is a dict letter -> child node, the END key marks a complete word
+   END = '$'
+
+   def __init__(self, words=()):
+      self.root = {}
+      for word in words:
+         self.add(word)
+
+   def add(self, word):
+      node = self.root
+      for letter in word:
+         node = node.setdefault(letter, {})
+      node[Trie.END] = True
+
+   def find(self, prefix):
+      # returns the node reached by following prefix, or None if no word starts with it
+      node = self.root
+      for letter in prefix:
+         node = node.get(letter)
+         if node is None:
+            return None
+      return node
+
+   def has_prefix(self, prefix):
+      return self.find(prefix) is not None
+
+   def __contains__(self, word):
+      node = self.find(word)
+      return node is not None and Trie.END in node
+
+# one read only trie per process, see load_trie
+trie = None
+
+def load_trie(path=DICTIONARY):
+   # the word list is compiled once into a .bin file and memory mapped afterwards,
+   # so building the trie in a fresh (worker) process only costs the trie itself
+   global trie
+   if trie is None:
+      trie = Trie(load_words(path))
+   return trie
+
+def make_board(size=boardSize):
+   return [[random.choice(string.ascii_lowercase) for c in range(size)] for r in range(size)]
+
+def parse_board(line):
+   # a board is written on one line, either as rows separated by whitespace
+   # ("abcd efgh ijkl mnop") or as all letters in a row ("abcdefghijklmnop")
+   rows = line.split()
+   if len(rows) == 1:
+      size = int(len(rows[0]) ** 0.5)
+      if size * size != len(rows[0]):
+         raise ValueError('board is not square: {!r}'.format(line))
+      rows = [rows[0][i:i + size] for i in range(0, len(rows[0]), size)]
+   if any(len(row) != len(rows) for row in rows):
+      raise ValueError('board is not square: {!r}'.format(line))
+   return [list(row.lower()) for row in rows]
+
+def board_to_str(board):
+   return ' '.join(''.join(row) for row in board)
 
 def format_row(row):
    return '|' + '|'.join('{0:^3s}'.format(x) for x in row) + '|'
@@ -24,57 +82,150 @@ def format_row(row):
 def format_board(board):
    return '\n\n'.join(format_row(row) for row in board)
 
-def word_valid(new_word):
-   for word in words:
-      if(new_word in word):
-         return True
-   return False
-
-def word_not_found(new_word):
-   for word in found_words:
-      if(word == new_word):
-         return False
-   return True
-
-def word_exists(new_word):
-   for word in words:
-      if((word == new_word) and word_not_found(new_word)):
-         return True
-   return False
-
-def neighbour_valid(x, y, word):
-   if(x == boardSize):
-      x = 0
-   elif(x == -1):
-      x = boardSize - 1
-   elif(y == boardSize):
-      y = 0
-   elif(y == -1):
-      y = boardSize - 1
-
-   if not (word_valid(word + board[x][y])):
-      if (word_exists(word)):
-         found_words.append(word)
+def score(words):
+   # official Boggle scoring, words shorter than 3 letters are worth nothing
+   points = {3: 1, 4: 1, 5: 2, 6: 3, 7: 5}
+   return sum(points.get(len(word), 11 if len(word) >= 8 else 0) for word in words)
+
+@functools.lru_cache(maxsize=None)
+def neighbours(size):
+   # for every cell index (x * size + y) the cells touching it horizontally, vertically
+   # or diagonally, computed once per board size
+   table = []
+   for x in range(size):
+      for y in range(size):
+         table.append(tuple((x + dx) * size + y + dy
+                            for dx in (-1, 0, 1) for dy in (-1, 0, 1)
+                            if (dx or dy) and 0 <= x + dx < size and 0 <= y + dy < size))
+   return table
+
+def solve(board, trie=None):
+   # Returns the sorted list of dictionary words that can be formed on an NxN board
+   # following the standard rules: consecutive letters touch (8 neighbours) and every
+   # tile is used at most once per word.
+   # The search is an iterative DFS with an explicit stack, so large boards cannot hit
+   # the recursion limit. The tiles used by a path are kept as one integer bitmask.
+   if trie is None:
+      trie = load_trie()
+   size = len(board)
+   letters = [letter for row in board for letter in row]
+   adjacent = neighbours(size)
+   found_words = set()
+
+   stack = []
+   for cell in range(size * size):
+      node = trie.root.get(letters[cell])
+      if node is not None:
+         stack.append((cell, node, letters[cell], 1 << cell))
+
+   while stack:
+      cell, node, word, visited = stack.pop()
+      if Trie.END in node:
+         found_words.add(word)
+      for next_cell in adjacent[cell]:
+         if visited >> next_cell & 1:
+            continue
+         # follow the trie one letter down, no child means no word starts with this path
+         child = node.get(letters[next_cell])
+         if child is not None:
+            stack.append((next_cell, child, word + letters[next_cell], visited | 1 << next_cell))
+
+   return sorted(found_words)
+
+def solve_record(board):
+   words = solve(board)
+   return board, words, score(words)
+
+def solve_batch(boards):
+   return [solve_record(board) for board in boards]
+
+def solve_boards(boards, processes=None, chunksize=64, path=DICTIONARY):
+   # Solve an iterable (list, file, generator) of boards over a process pool and yield
+   # (board, words, score) records in input order. The boards are consumed lazily: they
+   # are sent to the pool in batches of chunksize and at most two batches per worker
+   # are pending, so only those boards are in memory (Pool.imap would read all input
+   # into its task queue at once).
+   # The trie is built before the pool starts, so forked workers share it copy on write;
+   # the initializer only builds it in workers that are spawned instead of forked.
+   load_trie(path)
+   if processes == 1:
+      for board in boards:
+         yield solve_record(board)
+      return
+
+   boards = iter(boards)
+   workers = processes or os.cpu_count() or 1
+   with multiprocessing.Pool(processes, initializer=load_trie, initargs=(path,)) as pool:
+      pending = deque()
+      while True:
+         while len(pending) < 2 * workers:
+            batch = list(itertools.islice(boards, chunksize))
+            if not batch:
+               break
+            pending.append(pool.apply_async(solve_batch, (batch,)))
+         if not pending:
+            return
+         yield from pending.popleft().get()
+
+def read_boards(path):
+   # lazily read boards from a file, one board per line, - reads from stdin
+   # malformed lines are reported on stderr and skipped
+   file = sys.stdin if path == '-' else open(path)
+   try:
+      for number, line in enumerate(file, 1):
+         if line.strip() and not line.startswith('#'):
+            try:
+               board = parse_board(line)
+            except ValueError as error:
+               print('{}:{}: skipped, {}'.format(path, number, error), file=sys.stderr)
+               continue
+            yield board
+   finally:
+      if file is not sys.stdin:
+         file.close()
+
+def random_boards(n, size=boardSize):
+   for i in range(n):
+      yield make_board(size)
+
+def main(argv=None):
+   parser = argparse.ArgumentParser(description='Find all dictionary words on Boggle boards.')
+   parser.add_argument('--boards', help='file with one board per line, - for stdin')
+   parser.add_argument('--random', type=int, metavar='N', help='solve N random boards')
+   parser.add_argument('--size', type=int, default=boardSize, help='size of random boards')
+   parser.add_argument('--processes', type=int, default=None, help='worker processes (default: nr of cpus)')
+   parser.add_argument('--dictionary', default=DICTIONARY, help='word list (.txt or compiled .bin)')
+   args = parser.parse_args(argv)
+
+   if args.boards is None and args.random is None:
+      # single random board, print the board and the words found on it
+      board = make_board(args.size)
+      print(format_board(board))
+      for word in solve(board, load_trie(args.dictionary)):
          print(word)
-      return False
-   word += board[x][y]
-   find_words(x, y, word)
-
-def find_words(x, y, word):
-   neighbour_valid(x - 1, y, word)
-   neighbour_valid(x + 1, y, word)
-   neighbour_valid(x, y - 1, word)
-   neighbour_valid(x, y + 1, word)
-
-print(format_board(board))
-
-for x in range(boardSize):
-   for y in range(boardSize):
-      find_words(x, y, board[x][y])
+      return
+
+   if args.boards is not None:
+      boards = read_boards(args.boards)
+   else:
+      boards = random_boards(args.random, args.size)
+
+   # stream one record per board: board, score, words
+   t0 = time.perf_counter()
+   count = 0
+   for board, words, points in solve_boards(boards, args.processes, path=args.dictionary):
+      print('{}\t{}\t{}'.format(board_to_str(board), points, ','.join(words)))
+      count += 1
+   t1 = time.perf_counter()
+   print('{} boards in {:.2f} secs ({:.1f} boards/sec)'.format(count, t1 - t0, count / max(t1 - t0, 1e-9)),
+         file=sys.stderr)
+
+if __name__ == '__main__':
+   main()
 
 # Timecomplexity: O(b^D)
+# with the trie the search only follows paths that are a prefix of some word, so in
+# practice the explored tree is far smaller than b^D and every step costs O(1)
 
-# b = 4
-# D = 25 want het langste woord is 25 characters lang 
-
-# 16^25 = 1.267.650.600.228.229.401.496.703.205.376
\ No newline at end of file
+# b = 8 (standard rules, diagonal neighbours included)
+# D = 25 want het langste woord is 25 characters lang
@@ -0,0 +1,135 @@
+import mmap
+import os
+import struct
+import sys
+import numpy as np
+
+# Compiled word list format (all integers little endian):
+#   header   MAGIC, VERSION (uint32), number of words n (uint32)
+#   offsets  n+1 uint32 byte offsets into the string table
+#   strings  the sorted words encoded as utf-8, without separators
+# The file is opened with mmap, so loading costs next to nothing and the pages are
+# shared between all processes that map the same file.
+
+MAGIC = b'WLST'
+VERSION = 2 # 1 dropped the letters of latin-1 word lists that are not valid utf-8
+HEADER = struct.Struct('<4sII')
+EXTENSION = '.bin'
+
+def read_words(path):
+    # parse a plain text word list, one or more words per line; utf-8, or latin-1 when
+    # the file is not valid utf-8 (like words_NL.txt)
+    with open(path, 'rb') as file:
+        data = file.read()
+    try:
+        text = data.decode('utf-8')
+    except UnicodeDecodeError:
+        text = data.decode('latin-1')
+    return text.split()
+
+def compile_words(words, path):
+    # write the words as a sorted string table plus offsets
+    data = sorted(set(word.encode('utf-8') for word in words))
+    offsets = [0]
+    for word in data:
+        offsets.append(offsets[-1] + len(word))
+
+    # write to a temporary file first so other processes never map a half written file
+    tmp = '{}.{}.tmp'.format(path, os.getpid())
+    with open(tmp, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, VERSION, len(data)))
+        file.write(struct.pack('<{}I'.format(len(offsets)), *offsets))
+        file.write(b''.join(data))
+    os.replace(tmp, path)
+
+def compile_dictionary(source, target=None):
+    # compile a text word list, by default next to the source as <name>.bin
+    if target is None:
+        target = os.path.splitext(source)[0] + EXTENSION
+    compile_words(read_words(source), target)
+    return target
+
+class MappedWordList:
+    # read only, sorted list of words backed by a memory mapped compiled word list
+
+    def __init__(self, path):
+        with open(path, 'rb') as file:
+            self.mm = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.count = HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError('{} is not a compiled word list'.format(path))
+        start = HEADER.size
+        end = start + 4 * (self.count + 1)
+        # explicit little endian, the file format does not depend on the machine
+        self.offsets = np.frombuffer(self.mm, dtype='<u4', count=self.count + 1, offset=start)
+        self.strings = end
+
+    def raw(self, i):
+        # the utf-8 bytes of word i, without decoding
+        return self.mm[self.strings + self.offsets[i]:self.strings + self.offsets[i+1]]
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += self.count
+        if not 0 <= i < self.count:
+            raise IndexError('word index out of range')
+        return self.raw(i).decode('utf-8')
+
+    def __iter__(self):
+        for i in range(self.count):
+            yield self.raw(i).decode('utf-8')
+
+    def bisect(self, key):
+        # index of the first word >= key (key as bytes), the table is sorted bytewise
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.raw(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def __contains__(self, word):
+        key = word.encode('utf-8')
+        i = self.bisect(key)
+        return i < self.count and self.raw(i) == key
+
+    def has_prefix(self, prefix):
+        key = prefix.encode('utf-8')
+        i = self.bisect(key)
+        return i < self.count and self.raw(i).startswith(key)
+
+def is_compiled(path):
+    # True if path is a compiled word list of the current version
+    with open(path, 'rb') as file:
+        header = file.read(HEADER.size)
+    return len(header) == HEADER.size and HEADER.unpack(header)[:2] == (MAGIC, VERSION)
+
+def load_words(path):
+    # Load a word list. A text list is compiled once into a .bin file next to it and
+    # recompiled when the text file is newer or the file format changed; after that it
+    # is only memory mapped.
+    if path.endswith(EXTENSION):
+        return MappedWordList(path)
+
+    target = os.path.splitext(path)[0] + EXTENSION
+    try:
+        if (not os.path.exists(target) or os.path.getmtime(target) < os.path.getmtime(path)
+                or not is_compiled(target)):
+            compile_dictionary(path, target)
+    except OSError:
+        # cannot write the cache (e.g. read only directory), fall back to parsing
+        return sorted(set(read_words(path)))
+    return MappedWordList(target)
+
+if __name__ == '__main__':
+    # usage: python dictionary.py words.txt [words.bin]
+    if len(sys.argv) < 2:
+        print('usage: python dictionary.py <word list> [<compiled file>]')
+        sys.exit(1)
+    target = compile_dictionary(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else None)
+    print('compiled', sys.argv[1], '->', target)
@@ -13,6 +13,13 @@ GOAL_C  = 'yellow'
 START = (0, 0) # try to modify the start position
 SIZE  = 25     # the nr of nodes=grid crossings in a row (or column)
 GOAL  = (int(SIZE/2), int(SIZE/2))
+SEED  = None   # seed of the random grid and goal, None for a new grid every time
+
+# nr of landmarks for the ALT heuristic
+LANDMARKS = 8
+
+# cluster size (in nodes) of the abstract graph for HPA*
+CLUSTER = 8
 
 # pixel sizes
 CELL  = 35           # size of cell in pixels
@@ -20,4 +27,9 @@ W  = (SIZE-1) * CELL # width of grid in pixels
 H  = W               # height of grid
 TR = 10              # translate/move the grid, upper left is TR,TR
 
+# rendering: 'canvas' draws every node and edge as a canvas item, 'raster' draws into an
+# off-screen image (see render.py), which stays fast on large grids
+RENDER = 'canvas' if SIZE <= 50 else 'raster'
+PIXEL  = max(1, 1000 // SIZE) # size of a node in pixels in raster mode
+
 
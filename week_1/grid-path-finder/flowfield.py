@@ -0,0 +1,58 @@
+from collections import OrderedDict
+import numpy as np
+from landmarks import bfs_distances
+
+# Goal rooted distance fields for many-to-one queries.
+#
+# One reverse BFS from the goal gives the distance to the goal for every node. Any
+# agent can then walk to the goal by stepping to a neighbour that is one closer, in
+# O(path length) and without a search of its own. Fields are cached per (grid version,
+# goal) and handed out read only, so all agents can share them.
+
+UNREACHABLE = -1
+MAX_CACHED = 16
+
+cache = OrderedDict()  # (version, goal) -> field, least recently used first
+
+def distance_field(blocked, goal, version=None):
+    """Returns a read only int32 array [x][y] with the nr of steps from every node to
+       goal, UNREACHABLE (-1) for blocked and unreachable nodes. When a version of the
+       grid is given the field is cached for that (version, goal).
+    """
+    key = (version, tuple(goal))
+    if version is not None and key in cache:
+        cache.move_to_end(key)
+        return cache[key]
+
+    blocked = np.ascontiguousarray(blocked, dtype=np.uint8)
+    width, height = blocked.shape
+    if blocked[goal[0], goal[1]]:
+        # nothing reaches a blocked goal, not even the goal itself
+        field = np.full((width, height), UNREACHABLE, dtype=np.int32)
+    else:
+        dist = np.frombuffer(bfs_distances(blocked.tobytes(), width, height, goal[0] * height + goal[1]), dtype=np.float32)
+        field = np.where(np.isinf(dist), UNREACHABLE, dist).astype(np.int32).reshape(width, height)
+    field.flags.writeable = False
+
+    if version is not None:
+        cache[key] = field
+        if len(cache) > MAX_CACHED:
+            cache.popitem(last=False)
+    return field
+
+def follow(field, start):
+    # the path from start to the goal of the field, following the descending distances,
+    # or None if the goal can't be reached from start
+    x, y = start
+    d = field[x, y]
+    if d == UNREACHABLE:
+        return None
+    width, height = field.shape
+    path = [(x, y)]
+    while d > 0:
+        for nx, ny in ((x - 1, y), (x + 1, y), (x, y - 1), (x, y + 1)):
+            if 0 <= nx < width and 0 <= ny < height and field[nx, ny] == d - 1:
+                x, y, d = nx, ny, d - 1
+                break
+        path.append((x, y))
+    return path
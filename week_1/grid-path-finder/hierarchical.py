@@ -0,0 +1,229 @@
+import heapq
+import math
+from collections import deque
+import numpy as np
+
+class HierarchicalGrid:
+    """Hierarchical path finding (HPA*) for large 4-connected grids with unit step cost.
+
+       The grid is split in square clusters of cluster x cluster nodes. Along every border
+       between two clusters the runs of free node pairs become entrances (one transition in
+       the middle of a short run, one at both ends of a long run). The distances between
+       the entrances of a cluster are computed once with a BFS inside the cluster. Together
+       this is the abstract graph, which is much smaller than the grid.
+
+       A query connects start and goal to the entrances of their cluster, runs A* on the
+       abstract graph and only refines the abstract edges of the result into grid nodes.
+       Refined segments are cached. When cells change only the clusters around them are
+       marked dirty, and those are rebuilt lazily before the next query.
+
+       Paths are near optimal: they are optimal in the abstract graph, not in the grid.
+    """
+
+    def __init__(self, blocked, cluster=16):
+        walls = np.ascontiguousarray(blocked, dtype=np.uint8)
+        self.width, self.height = walls.shape
+        self.walls = bytearray(walls.tobytes())
+        self.size = cluster
+        self.clusters_x = math.ceil(self.width / cluster)
+        self.clusters_y = math.ceil(self.height / cluster)
+
+        self.transitions = {} # (cluster, cluster right/below it) -> list of (node, node)
+        self.partners = {}    # entrance node -> set of entrance nodes across the border
+        self.intra = {}       # cluster -> {entrance: [(entrance, distance), ...]}
+        self.segments = {}    # cluster -> {(node, node): refined path inside the cluster}
+        self.dirty = set()
+
+        for cx in range(self.clusters_x):
+            for cy in range(self.clusters_y):
+                if cx + 1 < self.clusters_x: self.build_border((cx, cy), (cx + 1, cy))
+                if cy + 1 < self.clusters_y: self.build_border((cx, cy), (cx, cy + 1))
+                self.dirty.add((cx, cy))
+        self.refresh()
+
+    def cluster_of(self, i):
+        x, y = divmod(i, self.height)
+        return (x // self.size, y // self.size)
+
+    def bounds(self, cluster):
+        cx, cy = cluster
+        return (cx * self.size, min((cx + 1) * self.size, self.width),
+                cy * self.size, min((cy + 1) * self.size, self.height))
+
+    def build_border(self, a, b):
+        # find the transitions between cluster a and cluster b (right of or below a)
+        for u, v in self.transitions.get((a, b), []):
+            self.partners[u].discard(v)
+            self.partners[v].discard(u)
+
+        x0, x1, y0, y1 = self.bounds(a)
+        if b[0] > a[0]:
+            # vertical border, pairs (x1 - 1, y) | (x1, y)
+            pairs = [((x1 - 1) * self.height + y, x1 * self.height + y) for y in range(y0, y1)]
+        else:
+            pairs = [(x * self.height + y1 - 1, x * self.height + y1) for x in range(x0, x1)]
+
+        transitions = []
+        run = []
+        for u, v in pairs + [(None, None)]:
+            if u is not None and not self.walls[u] and not self.walls[v]:
+                run.append((u, v))
+                continue
+            if run:
+                if len(run) < 6:
+                    transitions.append(run[len(run) // 2])
+                else:
+                    transitions.extend((run[0], run[-1]))
+                run = []
+
+        self.transitions[(a, b)] = transitions
+        for u, v in transitions:
+            self.partners.setdefault(u, set()).add(v)
+            self.partners.setdefault(v, set()).add(u)
+
+    def local_bfs(self, cluster, source):
+        # BFS from source restricted to the cluster, returns (distance, parent) dicts
+        x0, x1, y0, y1 = self.bounds(cluster)
+        height = self.height
+        dist = {source: 0}
+        parent = {source: None}
+        queue = deque([source])
+        while queue:
+            i = queue.popleft()
+            x, y = divmod(i, height)
+            for j, inside in ((i - height, x > x0), (i + height, x < x1 - 1), (i - 1, y > y0), (i + 1, y < y1 - 1)):
+                if inside and not self.walls[j] and j not in dist:
+                    dist[j] = dist[i] + 1
+                    parent[j] = i
+                    queue.append(j)
+        return dist, parent
+
+    def refresh(self):
+        # rebuild the intra cluster edges of all dirty clusters
+        if not self.dirty:
+            return
+        entrances = {}
+        for node, partners in self.partners.items():
+            if partners:
+                cluster = self.cluster_of(node)
+                if cluster in self.dirty:
+                    entrances.setdefault(cluster, []).append(node)
+
+        for cluster in self.dirty:
+            edges = {}
+            nodes = entrances.get(cluster, [])
+            for node in nodes:
+                dist, _ = self.local_bfs(cluster, node)
+                edges[node] = [(other, dist[other]) for other in nodes if other != node and other in dist]
+            self.intra[cluster] = edges
+            self.segments[cluster] = {}
+        self.dirty.clear()
+
+    def update_cells(self, changes):
+        # changes is an iterable of ((x, y), blocked); the clusters around a changed cell
+        # get new borders and are rebuilt before the next query
+        for (x, y), blocked in changes:
+            i = x * self.height + y
+            if bool(self.walls[i]) == bool(blocked):
+                continue
+            self.walls[i] = 1 if blocked else 0
+            cx, cy = self.cluster_of(i)
+            for a, b in (((cx - 1, cy), (cx, cy)), ((cx, cy), (cx + 1, cy)),
+                         ((cx, cy - 1), (cx, cy)), ((cx, cy), (cx, cy + 1))):
+                if (a, b) in self.transitions:
+                    self.build_border(a, b)
+                    self.dirty.update((a, b))
+            self.dirty.add((cx, cy))
+
+    def connect(self, node):
+        # temporary edges from a query node to the entrances of its cluster
+        cluster = self.cluster_of(node)
+        dist, _ = self.local_bfs(cluster, node)
+        return [(entrance, dist[entrance]) for entrance in self.intra[cluster] if entrance in dist]
+
+    def abstract_search(self, start, goal):
+        # A* on the abstract graph, returns the list of abstract nodes or None
+        extra = {start: self.connect(start)}
+        for entrance, d in self.connect(goal):
+            extra.setdefault(entrance, []).append((goal, d))
+        if self.cluster_of(start) == self.cluster_of(goal):
+            dist, _ = self.local_bfs(self.cluster_of(start), start)
+            if goal in dist:
+                extra[start].append((goal, dist[goal]))
+
+        height = self.height
+        gx, gy = divmod(goal, height)
+        def heuristic(i):
+            x, y = divmod(i, height)
+            return abs(x - gx) + abs(y - gy)
+
+        best = {start: 0}
+        parent = {start: None}
+        heap = [(heuristic(start), 0, start)]
+        while heap:
+            f, g, node = heapq.heappop(heap)
+            if g > best[node]:
+                continue
+            if node == goal:
+                path = []
+                while node is not None:
+                    path.append(node)
+                    node = parent[node]
+                path.reverse()
+                return path, g
+
+            neighbours = list(extra.get(node, ()))
+            cluster_edges = self.intra.get(self.cluster_of(node), {})
+            neighbours.extend(cluster_edges.get(node, ()))
+            neighbours.extend((partner, 1) for partner in self.partners.get(node, ()))
+            for other, cost in neighbours:
+                new_g = g + cost
+                if new_g < best.get(other, math.inf):
+                    best[other] = new_g
+                    parent[other] = node
+                    heapq.heappush(heap, (new_g + heuristic(other), new_g, other))
+        return None, None
+
+    def refine(self, u, v):
+        # grid nodes from u to v (excluding u), u and v are neighbours or in one cluster
+        if v in self.partners.get(u, ()):
+            return [v]
+        cluster = self.cluster_of(u)
+        cache = self.segments[cluster]
+        if (u, v) in cache:
+            return cache[(u, v)]
+
+        _, parent = self.local_bfs(cluster, u)
+        segment = []
+        node = v
+        while node != u:
+            segment.append(node)
+            node = parent[node]
+        segment.reverse()
+        # only segments between entrances are reused, not those to query nodes
+        if u in self.partners and v in self.partners:
+            cache[(u, v)] = segment
+        return segment
+
+    def find_path(self, start, goal, refine=True):
+        """Returns (path, cost): the path as a list of (x, y) nodes from start to goal (the
+           abstract nodes only if refine is False), or (None, None) if there is no path.
+        """
+        self.refresh()
+        start = start[0] * self.height + start[1]
+        goal = goal[0] * self.height + goal[1]
+        if self.walls[start] or self.walls[goal]:
+            return None, None
+        if start == goal:
+            return [divmod(start, self.height)], 0
+
+        abstract, cost = self.abstract_search(start, goal)
+        if abstract is None:
+            return None, None
+        if not refine:
+            return [divmod(i, self.height) for i in abstract], cost
+
+        path = [start]
+        for u, v in zip(abstract, abstract[1:]):
+            path.extend(self.refine(u, v))
+        return [divmod(i, self.height) for i in path], cost
@@ -0,0 +1,127 @@
+import array
+import math
+import numpy as np
+from model import IndexedPriorityQueue
+
+class DStarLite:
+    """Incremental planner (D* Lite) for a 4-connected grid with unit step cost.
+
+       The planner searches backwards from the goal and keeps its search state (g and
+       rhs values and the queue of inconsistent nodes) between calls. When cells change,
+       only the nodes whose distance to the goal is affected are expanded again, so a
+       replan costs in proportion to the change instead of to the size of the map. The
+       start may move along the path between replans (move_start).
+
+       Usage:
+           planner = DStarLite(blocked, start, goal)
+           path, cost = planner.plan()
+           planner.update_cells([((x, y), True), ((x2, y2), False)])  # blocked / free
+           path, cost = planner.plan()
+    """
+
+    def __init__(self, blocked, start, goal):
+        walls = np.ascontiguousarray(blocked, dtype=np.uint8)
+        self.width, self.height = walls.shape
+        self.walls = bytearray(walls.tobytes())
+        size = self.width * self.height
+
+        # g: distance to the goal of the last expansion, rhs: one step lookahead value
+        self.g = array.array('f', [math.inf]) * size
+        self.rhs = array.array('f', [math.inf]) * size
+        self.queue = IndexedPriorityQueue()
+        self.km = 0
+        self.expanded = 0  # nr of node expansions during the last plan()
+
+        self.start = self.index(start)
+        self.last = self.start
+        self.goal = self.index(goal)
+        self.rhs[self.goal] = 0
+        self.queue.put(self.goal, self.key(self.goal))
+
+    def index(self, node):
+        return node[0] * self.height + node[1]
+
+    def heuristic(self, a, b):
+        ax, ay = divmod(a, self.height)
+        bx, by = divmod(b, self.height)
+        return abs(ax - bx) + abs(ay - by)
+
+    def key(self, i):
+        k = min(self.g[i], self.rhs[i])
+        return (k + self.heuristic(self.start, i) + self.km, k)
+
+    def neighbours(self, i):
+        x, y = divmod(i, self.height)
+        if x > 0: yield i - self.height
+        if x < self.width - 1: yield i + self.height
+        if y > 0: yield i - 1
+        if y < self.height - 1: yield i + 1
+
+    def cost(self, i, j):
+        return math.inf if self.walls[i] or self.walls[j] else 1
+
+    def update_vertex(self, i):
+        if i != self.goal:
+            self.rhs[i] = min((self.cost(i, j) + self.g[j] for j in self.neighbours(i)), default=math.inf)
+        if i in self.queue:
+            self.queue.remove(i)
+        if self.g[i] != self.rhs[i]:
+            self.queue.put(i, self.key(i))
+
+    def compute_shortest_path(self):
+        queue, g, rhs = self.queue, self.g, self.rhs
+        while not queue.empty() and (queue.min_priority() < self.key(self.start) or rhs[self.start] != g[self.start]):
+            old_key = queue.min_priority()
+            i = queue.get()
+            new_key = self.key(i)
+            if old_key < new_key:
+                # the key is outdated because the start moved, queue it again
+                queue.put(i, new_key)
+            elif g[i] > rhs[i]:
+                # overconsistent: the distance got shorter
+                self.expanded += 1
+                g[i] = rhs[i]
+                for j in self.neighbours(i):
+                    self.update_vertex(j)
+            else:
+                # underconsistent: the distance got longer, recompute i and its neighbours
+                self.expanded += 1
+                g[i] = math.inf
+                self.update_vertex(i)
+                for j in self.neighbours(i):
+                    self.update_vertex(j)
+
+    def plan(self):
+        """Repairs the search state and returns (path, cost), path is a list of (x, y)
+           from the start to the goal, or (None, None) if the goal can't be reached.
+        """
+        self.expanded = 0
+        self.compute_shortest_path()
+        if self.rhs[self.start] == math.inf:
+            return None, None
+
+        # follow the cheapest neighbour to the goal
+        path = [divmod(self.start, self.height)]
+        i = self.start
+        while i != self.goal:
+            i = min(self.neighbours(i), key=lambda j: self.cost(i, j) + self.g[j])
+            path.append(divmod(i, self.height))
+        return path, int(self.rhs[self.start])
+
+    def update_cells(self, changes):
+        # changes is an iterable of ((x, y), blocked), only cells that really change
+        # (and their neighbours) become inconsistent
+        for node, blocked in changes:
+            i = self.index(node)
+            if bool(self.walls[i]) == bool(blocked):
+                continue
+            self.walls[i] = 1 if blocked else 0
+            self.update_vertex(i)
+            for j in self.neighbours(i):
+                self.update_vertex(j)
+
+    def move_start(self, start):
+        # the agent moved (e.g. along the path), keys stay valid by raising km
+        start = self.index(start)
+        self.km += self.heuristic(self.last, start)
+        self.last = self.start = start
@@ -0,0 +1,128 @@
+import array
+import hashlib
+import math
+import os
+import random
+from collections import deque
+import numpy as np
+
+# ALT heuristic (A*, Landmarks, Triangle inequality) for repeated queries on a fixed grid.
+#
+# Preprocessing picks K landmark nodes and stores the exact distance from every landmark
+# to every node. For a landmark L the triangle inequality gives
+#     d(n, goal) >= |d(L, goal) - d(L, n)|
+# so the maximum over all landmarks is an admissible (and consistent) heuristic that,
+# unlike a straight line distance, knows about the obstacles.
+# The tables are saved next to the grid file together with a digest of the blocked
+# nodes, so later queries on the same layout pay no preprocessing cost.
+
+EXTENSION = '.landmarks.npz'
+
+def grid_digest(blocked):
+    blocked = np.ascontiguousarray(blocked, dtype=bool)
+    return hashlib.sha1(np.packbits(blocked).tobytes() + str(blocked.shape).encode()).hexdigest()
+
+def bfs_distances(walls, width, height, source):
+    # exact distances (nr of steps) from node index source to every node, inf if unreachable
+    dist = array.array('f', [math.inf]) * (width * height)
+    dist[source] = 0
+    queue = deque([source])
+    while queue:
+        i = queue.popleft()
+        x, y = divmod(i, height)
+        d = dist[i] + 1
+        for j, inside in ((i - height, x > 0), (i + height, x < width - 1), (i - 1, y > 0), (i + 1, y < height - 1)):
+            if inside and not walls[j] and dist[j] == math.inf:
+                dist[j] = d
+                queue.append(j)
+    return dist
+
+class Landmarks:
+    def __init__(self, shape, cells, distances, digest):
+        self.shape = shape            # (width, height) of the grid
+        self.cells = cells            # list of (x, y) landmark nodes
+        self.distances = distances    # float32 array (K, width * height)
+        self.digest = digest          # digest of the blocked nodes it was built for
+        # typed arrays for fast access of single values during the search
+        self.tables = [array.array('f', row.tobytes()) for row in distances]
+
+    @staticmethod
+    def build(blocked, k=8, seed=None):
+        # Pick k landmarks by farthest point selection: the first one is the node farthest
+        # from a random free node, every next one the node farthest from all landmarks so
+        # far. Landmarks at the border of the map give the most informative bounds.
+        # Nodes that can't reach the landmarks get h = 0, which is still admissible.
+        blocked = np.ascontiguousarray(blocked, dtype=bool)
+        width, height = blocked.shape
+        walls = blocked.astype(np.uint8).tobytes()
+        free = np.flatnonzero(~blocked.ravel())
+        if len(free) == 0:
+            raise ValueError('grid has no free nodes')
+
+        # Start from a node in the main connected area (a random free node can be in a
+        # small closed pocket); landmarks are only placed in the area of the start node.
+        rng = random.Random(seed)
+        for _ in range(10):
+            row = np.frombuffer(bfs_distances(walls, width, height, int(free[rng.randrange(len(free))])), dtype=np.float32)
+            if np.count_nonzero(~np.isinf(row)) * 2 >= len(free):
+                break
+
+        # distance to the nearest landmark so far, unreachable and blocked nodes are never picked
+        nearest = np.where(np.isinf(row), -1, row)
+        nearest[blocked.ravel()] = -1
+
+        cells, rows = [], []
+        for n in range(min(k, len(free))):
+            i = int(np.argmax(nearest))
+            row = np.frombuffer(bfs_distances(walls, width, height, i), dtype=np.float32)
+            cells.append(divmod(i, height))
+            rows.append(row)
+            # the random start node is not a landmark, forget its distances
+            distance = np.where(np.isinf(row), -1, row)
+            nearest = distance if n == 0 else np.minimum(nearest, distance)
+
+        return Landmarks((width, height), cells, np.array(rows, dtype=np.float32), grid_digest(blocked))
+
+    def heuristic(self, goal):
+        # returns h(x, y), the ALT lower bound on the distance from (x, y) to goal
+        height = self.shape[1]
+        g = goal[0] * height + goal[1]
+        pairs = [(table, table[g]) for table in self.tables if table[g] != math.inf]
+
+        def h(x, y):
+            i = x * height + y
+            best = 0
+            for table, to_goal in pairs:
+                # inf when the landmark reaches the goal but not (x, y): no path at all
+                d = abs(to_goal - table[i])
+                if d > best:
+                    best = d
+            return best
+        return h
+
+    def save(self, path):
+        np.savez_compressed(path, shape=np.array(self.shape), cells=np.array(self.cells, dtype=np.int32).reshape(-1, 2),
+                            distances=self.distances, digest=np.array(self.digest))
+
+    @staticmethod
+    def load(path, blocked=None):
+        # load landmark tables, when blocked is given they have to match its layout
+        with np.load(path) as data:
+            landmarks = Landmarks(tuple(int(v) for v in data['shape']), [tuple(int(v) for v in cell) for cell in data['cells']],
+                                  data['distances'], str(data['digest']))
+        if blocked is not None and landmarks.digest != grid_digest(blocked):
+            raise ValueError('landmarks in {} were built for another grid'.format(path))
+        return landmarks
+
+def load_or_build(grid_path, blocked, k=8):
+    # landmarks stored next to the grid file as <grid file>.landmarks.npz, rebuilt and
+    # saved again when they are missing or belong to another layout
+    path = grid_path + EXTENSION
+    if os.path.exists(path):
+        try:
+            return Landmarks.load(path, blocked)
+        except (ValueError, KeyError, OSError):
+            pass
+    landmarks = Landmarks.build(blocked, k)
+    landmarks.save(path)
+    return landmarks
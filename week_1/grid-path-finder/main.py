@@ -1,8 +1,10 @@
 import tkinter as tk
 from tkinter import ttk
 import model as mo
+import render
 import config as cf
 import random
+import numpy as np
 
 # global var
 START_FLAG = True # do not redraw grid when pressing start the first time
@@ -25,6 +27,7 @@ class MainApp(tk.Frame):
         self.re_plot()
 
     def pause(self):
+        if self.raster: self.raster.flush() # copy the changed tiles to the screen
         self.root.after(int(self.delay.get()) * 25) # pause in msec
         self.root.update_idletasks() # redraw widgets
 
@@ -32,10 +35,19 @@ class MainApp(tk.Frame):
         # init grid frame (and canvas)
         left_frame = tk.Frame(self.root)
         left_frame.grid(column=0, row=0, padx=3, pady=12)
-        self.canvas = tk.Canvas(left_frame, height=cf.H+4*cf.TR, width=cf.W+4*cf.TR, borderwidth=-cf.TR, bg = cf.BG_C)
+        if cf.RENDER == 'raster':
+            size = cf.SIZE * cf.PIXEL
+            self.canvas = tk.Canvas(left_frame, height=size+4*cf.TR, width=size+4*cf.TR, borderwidth=-cf.TR, bg = cf.BG_C)
+            self.raster = render.TkRaster(self.canvas, cf.SIZE, cf.PIXEL, cf.TR, cf.BG_C, cf.GRID_C)
+        else:
+            self.canvas = tk.Canvas(left_frame, height=cf.H+4*cf.TR, width=cf.W+4*cf.TR, borderwidth=-cf.TR, bg = cf.BG_C)
+            self.raster = None
         self.canvas.pack(fill=tk.BOTH, expand=True)
 
     def make_grid(self):
+        if self.raster:
+            self.raster.clear()
+            return
         # vertical lines
         for i in range(0, cf.W+1, cf.CELL):
             self.canvas.create_line(i+cf.TR, 0+cf.TR, i+cf.TR, cf.H+cf.TR, fill = cf.GRID_C)
@@ -43,24 +55,25 @@ class MainApp(tk.Frame):
         for i in range(0, cf.H+1, cf.CELL):
             self.canvas.create_line(0+cf.TR, i+cf.TR, cf.W+cf.TR, i+cf.TR, fill = cf.GRID_C)
 
-    def init_grid(self):
-        for x in range(cf.SIZE):
-            for y in range(cf.SIZE):
-                node = (x, y)
-                if mo.bernoulli_trial(self):
-                    mo.set_grid_value(node, 'b') # set as blocked
-                    self.plot_node(node, color=cf.BLOCK_C)
-                else:
-                    mo.set_grid_value(node, -1)  # init costs, -1 means infinite
-
+    def init_grid(self, seed):
+        blocked = mo.generate_grid(cf.SIZE, int(self.prob.get())/10, seed)
         # start and goal cannot be bloking nodes
+        blocked[cf.START] = blocked[cf.GOAL] = False
+        mo.set_grid(blocked)
         mo.set_grid_value(cf.START, 0)
-        mo.set_grid_value(cf.GOAL, -1)
+        for node in map(tuple, np.argwhere(blocked)):
+            self.plot_node(node, color=cf.BLOCK_C)
 
     def plot_line_segment(self, x0, y0, x1, y1, color):
+        if self.raster:
+            self.raster.plot_line_segment(x0, y0, x1, y1, color)
+            return
         self.canvas.create_line(x0*cf.CELL+cf.TR, y0*cf.CELL+cf.TR, x1*cf.CELL+cf.TR, y1*cf.CELL+cf.TR, fill = color, width = 2)
 
     def plot_node(self, node, color):
+        if self.raster:
+            self.raster.plot_node(node, color)
+            return
         # size of (red) square is 8 by 8
         x0 = node[0]*cf.CELL - 4
         y0 = node[1]*cf.CELL - 4
@@ -100,6 +113,12 @@ class MainApp(tk.Frame):
         r1_button.grid(column=1, row=3, columnspan=2, sticky='w')
         r2_button = tk.Radiobutton(lf1, text='A*', variable=self.alg, value='A*', command=select_alg)
         r2_button.grid(column=1, row=4, columnspan=2, sticky='w')
+        r3_button = tk.Radiobutton(lf1, text='JPS', variable=self.alg, value='JPS', command=select_alg)
+        r3_button.grid(column=1, row=5, columnspan=2, sticky='w')
+        r4_button = tk.Radiobutton(lf1, text='ALT', variable=self.alg, value='ALT', command=select_alg)
+        r4_button.grid(column=1, row=6, columnspan=2, sticky='w')
+        r5_button = tk.Radiobutton(lf1, text='HPA', variable=self.alg, value='HPA', command=select_alg)
+        r5_button.grid(column=1, row=7, columnspan=2, sticky='w')
         self.alg.set('UC')
 
         def box_update1(event):
@@ -131,14 +150,36 @@ class MainApp(tk.Frame):
         box2.bind("<<ComboboxSelected>>", box_update2)  
 
     def re_plot(self):
-        cf.GOAL = (random.randint(int(cf.SIZE/2), cf.SIZE-1), random.randint(int(cf.SIZE/2), cf.SIZE-1))
+        # every grid comes from a seed, print it so the grid can be reproduced (cf.SEED)
+        seed = cf.SEED if cf.SEED is not None else random.randrange(2**32)
+        print('grid seed:', seed)
+        rng = random.Random(seed)
+        cf.GOAL = (rng.randint(int(cf.SIZE/2), cf.SIZE-1), rng.randint(int(cf.SIZE/2), cf.SIZE-1))
         # (re)paint grid and nodes
-        self.canvas.delete("all")
+        if not self.raster:
+            self.canvas.delete("all")
         self.make_grid()
-        self.init_grid()
+        self.init_grid(seed)
         # show start and goal nodes
         self.plot_node(cf.START, color=cf.START_C)
         self.plot_node(cf.GOAL, color=cf.GOAL_C)
+        if self.raster: self.raster.flush()
+
+    def replay(self, events):
+        # draw the event log of a search (see model.search_grid), one batch of canvas
+        # updates per expanded node with a pause in between, or everything in one batch
+        # when the delay is 0
+        batched = int(self.delay.get()) > 0
+        for kind, x0, y0, x1, y1 in events.tolist():
+            if kind == mo.EXPAND:
+                if batched: self.pause()
+            elif kind == mo.RELAX:
+                self.plot_line_segment(x0, y0, x1, y1, color=cf.PATH_C)
+                self.plot_node((x1, y1), color=cf.PATH_C)
+            elif kind == mo.PATH:
+                self.plot_line_segment(x0, y0, x1, y1, color=cf.FINAL_C)
+                if batched: self.pause()
+        self.pause()
 
     def draw_path(self, path):
         current = cf.GOAL
@@ -0,0 +1,155 @@
+import argparse
+import os
+import time
+from collections import namedtuple
+import numpy as np
+import config as cf
+import model as mo
+from landmarks import Landmarks, bfs_distances, load_or_build
+
+# Reading and writing grids and scenarios in the MovingAI benchmark format
+# (https://movingai.com/benchmarks/formats.html), so the planners can be compared on
+# the standard benchmark maps and on reproducible random instances.
+#
+# A .map file is a header followed by one text line per row of the map:
+#     type octile
+#     height 512
+#     width 512
+#     map
+#     ..@@T...
+# '.', 'G' and 'S' (swamp) are passable, '@', 'O', 'T' and 'W' are not (trees and water
+# count as blocked: the planners here only know free and blocked nodes). The map
+# rows are y, the grids here are indexed [x][y], so the text is transposed.
+#
+# A .scen file lists queries on a map, one per line after "version 1":
+#     bucket  map  width  height  start x  start y  goal x  goal y  optimal length
+# MovingAI computes the optimal length for 8-connected (octile) moves, the planners
+# here are 4-connected, so the optimal lengths of benchmark scenarios are a lower bound
+# here. Scenarios written by make_scenarios use the 4-connected lengths.
+
+PASSABLE = '.GS'
+FREE, BLOCKED = '.', '@'
+
+Scenario = namedtuple('Scenario', 'bucket map width height start goal optimal')
+
+def read_map(path):
+    # returns the blocked nodes of a .map file as a boolean array [x][y]
+    with open(path) as f:
+        header = {}
+        for line in f:
+            line = line.strip()
+            if line == 'map':
+                break
+            key, value = line.split(None, 1)
+            header[key] = value
+        else:
+            raise ValueError('{} is not a map file, no "map" line'.format(path))
+        width, height = int(header['width']), int(header['height'])
+        rows = [line.rstrip('\r\n') for line, _ in zip(f, range(height))]
+
+    if len(rows) != height or any(len(row) < width for row in rows):
+        raise ValueError('{} does not have {} rows of {} nodes'.format(path, height, width))
+    text = np.array([list(row[:width]) for row in rows])
+    return ~np.isin(text, list(PASSABLE)).T
+
+def write_map(path, blocked):
+    blocked = np.asarray(blocked, dtype=bool)
+    width, height = blocked.shape
+    with open(path, 'w') as f:
+        f.write('type octile\nheight {}\nwidth {}\nmap\n'.format(height, width))
+        for row in np.where(blocked.T, BLOCKED, FREE):
+            f.write(''.join(row) + '\n')
+
+def read_scen(path):
+    scenarios = []
+    with open(path) as f:
+        for line in f:
+            fields = line.split('\t') if '\t' in line else line.split()
+            if len(fields) < 9 or fields[0] == 'version':
+                continue
+            bucket, map_name, width, height, sx, sy, gx, gy = fields[:8]
+            scenarios.append(Scenario(int(bucket), map_name, int(width), int(height),
+                                      (int(sx), int(sy)), (int(gx), int(gy)), float(fields[8])))
+    return scenarios
+
+def write_scen(path, scenarios):
+    with open(path, 'w') as f:
+        f.write('version 1\n')
+        for s in scenarios:
+            f.write('\t'.join(str(v) for v in (s.bucket, s.map, s.width, s.height, s.start[0], s.start[1],
+                                               s.goal[0], s.goal[1], '{:.8f}'.format(s.optimal))) + '\n')
+
+def make_scenarios(blocked, n, seed=None, map_name='random.map'):
+    # n random solvable queries on the grid, with their (4-connected) optimal length;
+    # buckets group queries by length like in the MovingAI sets (bucket = length // 4)
+    blocked = np.ascontiguousarray(blocked, dtype=bool)
+    width, height = blocked.shape
+    walls = blocked.astype(np.uint8).tobytes()
+    free = np.flatnonzero(~blocked.ravel())
+    if len(free) < 2:
+        raise ValueError('grid has less than two free nodes')
+
+    rng = np.random.default_rng(seed)
+    scenarios = []
+    for _ in range(100 * n):
+        if len(scenarios) == n:
+            break
+        start, goal = (int(i) for i in rng.choice(free, 2, replace=False))
+        d = bfs_distances(walls, width, height, start)[goal]
+        if d == float('inf'):
+            continue
+        scenarios.append(Scenario(int(d) // 4, map_name, width, height, divmod(start, height),
+                                  divmod(goal, height), d))
+    return sorted(scenarios, key=lambda s: s.bucket)
+
+def run_scenarios(blocked, scenarios, algs=('UC', 'A*', 'JPS'), landmarks=None):
+    # solves every scenario with every algorithm and prints the totals per algorithm;
+    # ALT uses the given landmarks, or landmarks built once for all scenarios
+    blocked = np.ascontiguousarray(blocked, dtype=bool)
+    if 'ALT' in algs and landmarks is None:
+        landmarks = Landmarks.build(blocked, cf.LANDMARKS)
+    for alg in algs:
+        explored, seconds, wrong = 0, 0.0, 0
+        for s in scenarios:
+            t = time.perf_counter()
+            result = mo.search_grid(blocked, s.start, s.goal, alg, record=False, landmarks=landmarks)
+            seconds += time.perf_counter() - t
+            explored += result.explored
+            if result.path is None or abs(result.cost - s.optimal) > 1e-6:
+                wrong += 1
+        print('{:4} {:6} scenarios {:10} explored {:8.2f} s {:6} off the optimal length'.format(
+              alg, len(scenarios), explored, seconds, wrong))
+
+def main():
+    parser = argparse.ArgumentParser(description='MovingAI maps and scenarios')
+    parser.add_argument('--map', help='.map file to read, or to write with --random')
+    parser.add_argument('--scen', help='.scen file to read, or to write with --random')
+    parser.add_argument('--random', type=int, metavar='SIZE', help='generate a random SIZE x SIZE map and scenarios')
+    parser.add_argument('--prob', type=float, default=0.3, help='probability of a blocked node (default 0.3)')
+    parser.add_argument('--n', type=int, default=100, help='nr of generated scenarios (default 100)')
+    parser.add_argument('--seed', type=int, help='seed of the random map and scenarios')
+    parser.add_argument('--algs', default='UC,A*,JPS', help='algorithms to run (default UC,A*,JPS)')
+    args = parser.parse_args()
+
+    if args.random:
+        blocked = mo.generate_grid(args.random, args.prob, args.seed)
+        scenarios = make_scenarios(blocked, args.n, args.seed, os.path.basename(args.map or 'random.map'))
+        if args.map: write_map(args.map, blocked)
+        if args.scen: write_scen(args.scen, scenarios)
+    elif args.map:
+        blocked = read_map(args.map)
+        scenarios = read_scen(args.scen) if args.scen else make_scenarios(blocked, args.n, args.seed, os.path.basename(args.map))
+    else:
+        parser.error('give a --map or --random SIZE')
+
+    algs = args.algs.split(',')
+    landmarks = None
+    if 'ALT' in algs and args.map:
+        # the landmark tables are kept next to the map, later runs only load them
+        landmarks = load_or_build(args.map, blocked, cf.LANDMARKS)
+
+    print('map {} x {}, {} scenarios'.format(blocked.shape[0], blocked.shape[1], len(scenarios)))
+    run_scenarios(blocked, scenarios, algs, landmarks)
+
+if __name__ == '__main__':
+    main()
@@ -1,32 +1,161 @@
-import random
+import array
 import heapq
 import math
+from collections import namedtuple
 import config as cf
+import landmarks as lm
+import flowfield as ff
+from hierarchical import HierarchicalGrid
 import numpy as np
 
 # global var
 grid  = [[0 for x in range(cf.SIZE)] for y in range(cf.SIZE)]
+grid_version = 0 # incremented on every change of the grid
 
-class PriorityQueue:
-    # a wrapper around heapq (aka priority queue), a binary min-heap on top of a list
+class IndexedPriorityQueue:
+    # a binary min-heap that knows where every item is stored (self.pos), so the priority
+    # of a queued item can be changed in O(log n) instead of searching the whole heap
+    def __init__(self):
+        self.items = []      # heap of items
+        self.priorities = [] # priorities[i] is the priority of items[i]
+        self.pos = {}        # item -> index in the heap
+
+    def empty(self):
+        return len(self.items) == 0
+
+    def __len__(self):
+        return len(self.items)
+
+    def __contains__(self, item):
+        return item in self.pos
+
+    def priority(self, item):
+        return self.priorities[self.pos[item]]
+
+    # add an item, or change its priority when it is already in the queue
+    def put(self, item, priority):
+        i = self.pos.get(item)
+        if i is None:
+            self.items.append(item)
+            self.priorities.append(priority)
+            self.pos[item] = len(self.items) - 1
+            self.sift_up(len(self.items) - 1)
+        elif priority < self.priorities[i]:
+            self.priorities[i] = priority
+            self.sift_up(i)
+        else:
+            self.priorities[i] = priority
+            self.sift_down(i)
+
+    def decrease_key(self, item, priority):
+        i = self.pos[item]
+        if priority > self.priorities[i]:
+            raise ValueError('new priority is higher than the current priority')
+        self.priorities[i] = priority
+        self.sift_up(i)
+
+    def min_priority(self):
+        # priority of the root, without removing it
+        return self.priorities[0]
+
+    def remove(self, item):
+        # remove a queued item from anywhere in the heap
+        i = self.pos.pop(item)
+        last_item = self.items.pop()
+        last_priority = self.priorities.pop()
+        if i < len(self.items):
+            self.items[i] = last_item
+            self.priorities[i] = last_priority
+            self.pos[last_item] = i
+            self.sift_up(i)
+            self.sift_down(self.pos[last_item])
+
+    # get removes and returns the item with the smallest priority (the root of the heap)
+    def get(self):
+        item = self.items[0]
+        last_item = self.items.pop()
+        last_priority = self.priorities.pop()
+        del self.pos[item]
+        if self.items:
+            self.items[0] = last_item
+            self.priorities[0] = last_priority
+            self.pos[last_item] = 0
+            self.sift_down(0)
+        return item
+
+    def sift_up(self, i):
+        items, priorities, pos = self.items, self.priorities, self.pos
+        item, priority = items[i], priorities[i]
+        while i > 0:
+            parent = (i - 1) >> 1
+            if priorities[parent] <= priority:
+                break
+            items[i], priorities[i] = items[parent], priorities[parent]
+            pos[items[i]] = i
+            i = parent
+        items[i], priorities[i] = item, priority
+        pos[item] = i
+
+    def sift_down(self, i):
+        items, priorities, pos = self.items, self.priorities, self.pos
+        n = len(items)
+        item, priority = items[i], priorities[i]
+        while True:
+            child = 2 * i + 1
+            if child >= n:
+                break
+            if child + 1 < n and priorities[child + 1] < priorities[child]:
+                child += 1
+            if priorities[child] >= priority:
+                break
+            items[i], priorities[i] = items[child], priorities[child]
+            pos[items[i]] = i
+            i = child
+        items[i], priorities[i] = item, priority
+        pos[item] = i
+
+class LazyPriorityQueue:
+    # a wrapper around heapq (aka priority queue) with lazy deletion: changing a priority
+    # pushes a new entry, and outdated (stale) entries are skipped when they are popped
     def __init__(self):
-        # create a min heap (as a list)
         self.elements = []
-    
+        self.best = {}  # item -> current priority of the items in the queue
+        self.counter = 0
+
     def empty(self):
-        return len(self.elements) == 0
-    
-    # heap elements are tuples (priority, item)
+        return len(self.best) == 0
+
+    def __len__(self):
+        return len(self.best)
+
+    def __contains__(self, item):
+        return item in self.best
+
+    # heap elements are tuples (priority, counter, item), the counter breaks ties
     def put(self, item, priority):
-        heapq.heappush(self.elements, (priority, id(item), item))
-    
-    # pop returns the smallest item from the heap
-    # i.e. the root element = element (priority, item) with highest priority
+        self.best[item] = priority
+        heapq.heappush(self.elements, (priority, self.counter, item))
+        self.counter += 1
+
+    decrease_key = put
+
     def get(self):
-        return heapq.heappop(self.elements)[2]
+        while True:
+            priority, _, item = heapq.heappop(self.elements)
+            if self.best.get(item) == priority:
+                del self.best[item]
+                return item
 
-def bernoulli_trial(app):
-    return 1 if random.random() < int(app.prob.get())/10 else 0
+def generate_grid(size, prob, seed=None):
+    # random blocked nodes in one vectorized draw, every node is blocked with probability
+    # prob; the same seed always gives the same grid
+    return np.random.default_rng(seed).random((size, size)) < prob
+
+def set_grid(blocked):
+    # replace the whole grid by a blocked mask [x][y], free nodes get cost -1 (infinite)
+    global grid, grid_version
+    grid = [['b' if cell else -1 for cell in column] for column in np.asarray(blocked, dtype=bool).tolist()]
+    grid_version += 1
 
 def get_grid_value(node):
     # node is a tuple (x, y), grid is a 2D-list [x][y]
@@ -34,7 +163,9 @@ def get_grid_value(node):
 
 def set_grid_value(node, value): 
     # node is a tuple (x, y), grid is a 2D-list [x][y]
+    global grid_version
     grid[node[0]][node[1]] = value
+    grid_version += 1
 
 def euclidean_distance(n1, n2):
     """Calculates the euclidian distance between two points using 
@@ -42,78 +173,315 @@ def euclidean_distance(n1, n2):
     """
     return math.sqrt((n1[0] - n2[0])**2 + (n1[1] - n2[1])**2)
 
-def search(app, start, goal):
-    total_explored = 0
-    total_cost = 0
-    alg = app.alg.get()
+# event log of a search, one row (kind, x0, y0, x1, y1) per event
+EXPAND = 0 # node (x0, y0) is popped from the queue
+RELAX  = 1 # edge (x0, y0) -> (x1, y1) is explored
+PATH   = 2 # edge (x0, y0) -> (x1, y1) is part of the final path
+
+SearchResult = namedtuple('SearchResult', 'path cost explored events')
+
+# blocked mask of the grid and the grid version it was made for
+mask_cache = (None, None)
+
+def blocked_mask():
+    # the global grid as a 2D boolean NumPy array [x][y], True for blocked nodes
+    # (read only, rebuilt only when the grid changed)
+    global mask_cache
+    if mask_cache[0] != grid_version:
+        mask = np.array([[value == 'b' for value in column] for column in grid], dtype=bool)
+        mask.flags.writeable = False
+        mask_cache = (grid_version, mask)
+    return mask_cache[1]
+
+def distance_field(goal):
+    # distance field to goal on the current grid (see flowfield.distance_field), computed
+    # once per grid version and goal; follow it with flowfield.follow(field, start)
+    return ff.distance_field(blocked_mask(), goal, grid_version)
+
+def search_grid(blocked, start, goal, alg='UC', lazy=False, record=True, landmarks=None, hierarchy=None):
+    """Headless uniform cost / A* / ALT / JPS / HPA search on a grid of blocked nodes
+       (blocked[x][y], or an outofcore.MappedGrid for UC and A*).
+       ALT is A* with the landmark heuristic, landmarks is a landmarks.Landmarks built
+       for this grid (built here if None). HPA is hierarchical path finding on hierarchy, a
+       hierarchical.HierarchicalGrid built for this grid (built here if None).
+       Returns a SearchResult with the path (list of (x, y) from start to goal, None if
+       the goal can't be reached), its cost, the nr of explored edges and the event log
+       as an int32 NumPy array of (kind, x0, y0, x1, y1) rows (None if record is False).
+    """
+    # The search state is kept in flat typed arrays indexed by i = x * height + y,
+    # about 9 bytes per node and no per node Python objects:
+    #   cost     float32, cost to reach the node from start (inf if not reached yet)
+    #   parent   int32, index of the previous node on the best known path (-1 if none)
+    #   closed   bitmap, bit i is set when node i has been expanded
+    #   walls    1 byte per node, 1 for blocked nodes
+    # The heuristic is only computed for nodes that are put in the queue.
+    if hasattr(blocked, 'search'):
+        # grids that are not in memory (outofcore.MappedGrid) run their own search
+        return blocked.search(start, goal, alg, lazy, record)
+    if alg == 'JPS':
+        return jump_point_search(blocked, start, goal, lazy, record)
+    if alg == 'HPA':
+        if hierarchy is None:
+            hierarchy = HierarchicalGrid(blocked, cf.CLUSTER)
+        return hierarchical_search(hierarchy, start, goal, record)
+
+    walls = np.ascontiguousarray(blocked, dtype=np.uint8)
+    width, height = walls.shape
+    walls = walls.tobytes()
+    size = width * height
+    cost = array.array('f', [math.inf]) * size
+    parent = array.array('i', [-1]) * size
+    closed = bytearray((size + 7) >> 3)
 
-    start_node = Node(start, goal, alg)
-    start_node.total_cost = 0
+    gx, gy = goal
+    if alg == 'ALT':
+        # the landmark bound, but never less than the manhattan distance
+        if landmarks is None:
+            landmarks = lm.Landmarks.build(blocked, cf.LANDMARKS)
+        alt = landmarks.heuristic(goal)
+        def heuristic(x, y):
+            return max(alt(x, y), abs(x - gx) + abs(y - gy))
+    elif alg == 'A*':
+        def heuristic(x, y):
+            # manhattan distance, admissible for 4-connected moves
+            return abs(x - gx) + abs(y - gy)
+    else:
+        def heuristic(x, y):
+            return 0
 
-    # Init grid of nodes
-    nodes = np.array([Node((x, y), goal, alg) for x in range(cf.SIZE) for y in range(cf.SIZE)])
-    nodes.resize(cf.SIZE, cf.SIZE)
+    log = array.array('i')
+    total_explored = 0
+    goal_i = gx * height + gy
 
     # Make priority queue with the start node
-    queue = PriorityQueue()
-    queue.put(start_node, start_node.heuristic)
+    start_i = start[0] * height + start[1]
+    cost[start_i] = 0
+    queue = LazyPriorityQueue() if lazy else IndexedPriorityQueue()
+    queue.put(start_i, heuristic(*start))
 
     # Loop until the goal is the highest priority item in the queue
     while not queue.empty():
         # Pop the queue to get the starting node
-        node = queue.get()
-
-        # Reached ending criterion, backtrack to display the results
-        if node.x == goal[0] and node.y == goal[1]:
-            print('Found a solution!')
-            total_cost = node.total_cost
-            while node.prev_node != None:
-                app.plot_line_segment(node.x, node.y, node.prev_node.x, node.prev_node.y, color=cf.FINAL_C)
-                node = node.prev_node
-                app.pause()
+        i = queue.get()
+        x, y = divmod(i, height)
+        closed[i >> 3] |= 1 << (i & 7)
+        if record: log.extend((EXPAND, x, y, -1, -1))
+
+        # Reached ending criterion
+        if i == goal_i:
             break
 
-        # Visit all adjacent nodes
-        for adjacent in node.find_adjacent(nodes):
-            app.plot_line_segment(node.x, node.y, adjacent.x, adjacent.y, color=cf.PATH_C)
-            app.plot_node((adjacent.x, adjacent.y), color=cf.PATH_C)
+        # Visit all adjacent nodes (up, down, left, right) that are not blocked
+        node_cost = cost[i]
+        for j, inside in ((i - height, x > 0), (i + height, x < width - 1), (i - 1, y > 0), (i + 1, y < height - 1)):
+            if not inside or walls[j]:
+                continue
+
+            # Calculate the total cost to get to this node from start, every step costs 1
+            new_cost = node_cost + 1
+            if closed[j >> 3] >> (j & 7) & 1:
+                # expanded nodes are only reopened when a cheaper path is found
+                if new_cost >= cost[j]:
+                    continue
+                closed[j >> 3] &= ~(1 << (j & 7))
+
+            jx, jy = divmod(j, height)
+            if record: log.extend((RELAX, x, y, jx, jy))
             total_explored += 1
 
-            # Calculate the total cost to get to this node from start. If the total cost is lower then previously known,
-            #  update the score, and put this node in the queue.
-            cost = node.total_cost + adjacent.cost
-            if cost < adjacent.total_cost:
-                adjacent.total_cost = cost
-                # If this node is already in the queue, remove it so we can change the priority
-                for element in queue.elements:
-                    if element[2].x == adjacent.x and element[2].y == adjacent.y:
-                        queue.elements.remove(element)
-
-                queue.put(adjacent, cost + adjacent.heuristic)
-                adjacent.prev_node = node
-
-        app.pause()
-
-    print('Total explored nodes: ', total_explored)
-    print('Total cost to reach goal: ', total_cost)
-
-class Node():
-    def __init__(self, node, goal, alg):
-        self.x, self.y = node
-        self.state = get_grid_value(node)
-        self.cost = 1
-        self.total_cost = float('inf')
-        self.prev_node = None
-        self.heuristic = euclidean_distance(node, goal)*2 if alg == 'A*' else 0
-
-    def find_adjacent(self, nodes):
-        """Returns all adjacent nodes for node n in a 2d grid of nodes"""
-
-        adjacent = []
-        for x in range(-1,2):
-            for y in range(-1, 2):
-                if abs(x) ^ abs(y) and self.x + x >= 0 and self.x + x < cf.SIZE and self.y + y >= 0 and self.y + y < cf.SIZE:
-                    adjacent_node = nodes[self.x + x][self.y + y]
-                    if adjacent_node.state != 'b': adjacent.append(adjacent_node)
-
-        return adjacent
\ No newline at end of file
+            # If the total cost is lower then previously known, update the score, and put
+            #  this node in the queue (or lower its priority when it is already queued).
+            if new_cost < cost[j]:
+                cost[j] = new_cost
+                parent[j] = i
+                queue.put(j, new_cost + heuristic(jx, jy))
+
+    path = None
+    total_cost = None
+    if cost[goal_i] != math.inf:
+        # backtrack from the goal
+        total_cost = int(cost[goal_i])
+        i = goal_i
+        path = [divmod(i, height)]
+        while parent[i] != -1:
+            x, y = divmod(i, height)
+            i = parent[i]
+            px, py = divmod(i, height)
+            if record: log.extend((PATH, x, y, px, py))
+            path.append((px, py))
+        path.reverse()
+
+    events = np.frombuffer(log, dtype=np.int32).reshape(-1, 5) if record else None
+    return SearchResult(path, total_cost, total_explored, events)
+
+def jump_point_search(blocked, start, goal, lazy=False, record=True):
+    """Jump Point Search for a 4-connected grid with uniform step cost. Instead of every
+       neighbour, a node only gets the next jump points in the directions that can't be
+       reached as cheaply without passing through it, which skips all symmetric paths
+       through open areas. Returns a SearchResult like search_grid, with the same cost as
+       A*. RELAX events are the straight jumps between jump points.
+    """
+    walls = np.ascontiguousarray(blocked, dtype=np.uint8)
+    width, height = walls.shape
+    walls = walls.tobytes()
+    size = width * height
+    cost = array.array('f', [math.inf]) * size
+    parent = array.array('i', [-1]) * size
+    closed = bytearray((size + 7) >> 3)
+    gx, gy = goal
+
+    def free(x, y):
+        return 0 <= x < width and 0 <= y < height and not walls[x * height + y]
+
+    def jump_horizontal(x, y, dx):
+        # scan from (x, y) in direction dx, stop at the goal or at a node with a forced
+        # neighbour (a free node above/below it that is blocked behind it)
+        while free(x, y):
+            if (x == gx and y == gy) or (free(x, y - 1) and not free(x - dx, y - 1)) \
+                                     or (free(x, y + 1) and not free(x - dx, y + 1)):
+                return x, y
+            x += dx
+        return None
+
+    def jump_vertical(x, y, dy):
+        # like jump_horizontal, but a node is also a jump point when a horizontal scan
+        # from it finds one
+        while free(x, y):
+            if (x == gx and y == gy) or (free(x - 1, y) and not free(x - 1, y - dy)) \
+                                     or (free(x + 1, y) and not free(x + 1, y - dy)):
+                return x, y
+            if jump_horizontal(x + 1, y, 1) or jump_horizontal(x - 1, y, -1):
+                return x, y
+            y += dy
+        return None
+
+    def directions(i, x, y):
+        # pruned directions: straight on and turning, never back to the parent
+        if parent[i] == -1:
+            return ((1, 0), (-1, 0), (0, 1), (0, -1))
+        px, py = divmod(parent[i], height)
+        if px != x:
+            dx = 1 if x > px else -1
+            return ((dx, 0), (0, 1), (0, -1))
+        dy = 1 if y > py else -1
+        return ((0, dy), (1, 0), (-1, 0))
+
+    def heuristic(x, y):
+        # manhattan distance, exact without obstacles and never too high
+        return abs(x - gx) + abs(y - gy)
+
+    log = array.array('i')
+    total_explored = 0
+    goal_i = gx * height + gy
+    start_i = start[0] * height + start[1]
+    cost[start_i] = 0
+    queue = LazyPriorityQueue() if lazy else IndexedPriorityQueue()
+    queue.put(start_i, heuristic(*start))
+
+    while not queue.empty():
+        i = queue.get()
+        x, y = divmod(i, height)
+        closed[i >> 3] |= 1 << (i & 7)
+        if record: log.extend((EXPAND, x, y, -1, -1))
+
+        if i == goal_i:
+            break
+
+        node_cost = cost[i]
+        for dx, dy in directions(i, x, y):
+            point = jump_horizontal(x + dx, y, dx) if dx else jump_vertical(x, y + dy, dy)
+            if point is None:
+                continue
+            jx, jy = point
+            j = jx * height + jy
+            new_cost = node_cost + abs(jx - x) + abs(jy - y)
+            if closed[j >> 3] >> (j & 7) & 1:
+                if new_cost >= cost[j]:
+                    continue
+                closed[j >> 3] &= ~(1 << (j & 7))
+
+            if record: log.extend((RELAX, x, y, jx, jy))
+            total_explored += 1
+
+            if new_cost < cost[j]:
+                cost[j] = new_cost
+                parent[j] = i
+                queue.put(j, new_cost + heuristic(jx, jy))
+
+    path = None
+    total_cost = None
+    if cost[goal_i] != math.inf:
+        # backtrack from the goal, filling in the nodes between the jump points
+        total_cost = int(cost[goal_i])
+        path = [(gx, gy)]
+        i = goal_i
+        while parent[i] != -1:
+            x, y = divmod(i, height)
+            i = parent[i]
+            px, py = divmod(i, height)
+            while (x, y) != (px, py):
+                nx = x + (px > x) - (px < x)
+                ny = y + (py > y) - (py < y)
+                if record: log.extend((PATH, x, y, nx, ny))
+                x, y = nx, ny
+                path.append((x, y))
+        path.reverse()
+
+    events = np.frombuffer(log, dtype=np.int32).reshape(-1, 5) if record else None
+    return SearchResult(path, total_cost, total_explored, events)
+
+def hierarchical_search(hierarchy, start, goal, record=True):
+    # HPA* on a HierarchicalGrid as a SearchResult; the abstract graph is searched instead
+    # of the grid, so only the path is logged and no grid edges count as explored
+    path, total_cost = hierarchy.find_path(start, goal)
+    log = array.array('i')
+    if record and path is not None:
+        for (x0, y0), (x1, y1) in zip(path[:0:-1], path[-2::-1]):
+            log.extend((PATH, x0, y0, x1, y1))
+    events = np.frombuffer(log, dtype=np.int32).reshape(-1, 5) if record else None
+    return SearchResult(path, total_cost, 0, events)
+
+# landmarks of the last grid searched with ALT
+landmark_cache = None
+
+# abstract graph for HPA, with the grid version and blocked mask it is up to date with
+hierarchy_cache = (None, None, None)
+
+def grid_hierarchy():
+    # the HPA abstract graph of the current grid; after edits only the clusters around the
+    # changed cells are rebuilt, a grid that changed a lot (or in size) is built anew
+    global hierarchy_cache
+    blocked = blocked_mask()
+    version, hpa, old = hierarchy_cache
+    if version != grid_version:
+        if hpa is None or old.shape != blocked.shape:
+            hpa = HierarchicalGrid(blocked, cf.CLUSTER)
+        else:
+            changed = np.argwhere(old != blocked)
+            if len(changed) * 8 > blocked.size:
+                hpa = HierarchicalGrid(blocked, cf.CLUSTER)
+            else:
+                hpa.update_cells(((int(x), int(y)), blocked[x, y]) for x, y in changed)
+        hierarchy_cache = (grid_version, hpa, blocked)
+    return hpa
+
+def search(app, start, goal, lazy=False):
+    # run the search headless on the current grid, then let the app replay the event log
+    global landmark_cache
+    blocked = blocked_mask()
+    landmarks = None
+    hierarchy = None
+    if app.alg.get() == 'ALT':
+        if landmark_cache is None or landmark_cache.digest != lm.grid_digest(blocked):
+            landmark_cache = lm.Landmarks.build(blocked, cf.LANDMARKS)
+        landmarks = landmark_cache
+    elif app.alg.get() == 'HPA':
+        hierarchy = grid_hierarchy()
+    result = search_grid(blocked, start, goal, app.alg.get(), lazy, landmarks=landmarks, hierarchy=hierarchy)
+    if result.path is not None:
+        print('Found a solution!')
+    app.replay(result.events)
+
+    print('Total explored nodes: ', result.explored)
+    print('Total cost to reach goal: ', result.cost if result.path is not None else 0)
+    return result
@@ -0,0 +1,240 @@
+import argparse
+import array
+import heapq
+import math
+import mmap
+import os
+import struct
+import time
+import numpy as np
+from model import SearchResult, EXPAND, RELAX, PATH
+from mapio import PASSABLE
+
+# Out of core grids for maps that don't fit in memory.
+#
+# The blocked nodes are stored on disk as a bitmap (1 bit per node) and memory mapped,
+# so only the pages the search touches are read and the OS can drop them again. File
+# format (integers little endian):
+#   header   MAGIC, VERSION, width, height (uint32)
+#   bitmap   one row per y of ceil(width / 8) bytes, bit 7 - x % 8 of byte x // 8 is
+#            set for a blocked node (rows are y like in a MovingAI .map file)
+#
+# The search state is split in tiles of TILE x TILE nodes that are only allocated when
+# the search reaches them, untouched parts of the map cost nothing. Per node a tile
+# holds the cost (float32), the direction to the parent as a 2 bit code and a closed
+# bit: 4.4 bytes per reached node instead of the 9 bytes per node of search_grid.
+
+MAGIC = b'GRID'
+VERSION = 1
+HEADER = struct.Struct('<4sIII')
+EXTENSION = '.grid'
+
+TILE_BITS = 6
+TILE = 1 << TILE_BITS # tile size in nodes
+MASK = TILE - 1
+
+# parent direction codes: the step from a node back to its parent
+LEFT, RIGHT, UP, DOWN = 0, 1, 2, 3
+STEPS = ((-1, 0), (1, 0), (0, -1), (0, 1))
+
+scratch_bytes = 0 # memory of the search state of the last search
+
+def write_rows(path, width, height, rows):
+    # write a grid file from an iterable of height rows (y) of width booleans, one row
+    # at a time so the whole grid never has to be in memory
+    tmp = '{}.{}.tmp'.format(path, os.getpid())
+    written = 0
+    with open(tmp, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, width, height))
+        for row in rows:
+            row = np.asarray(row, dtype=bool)
+            if len(row) != width:
+                raise ValueError('row {} has {} nodes instead of {}'.format(written, len(row), width))
+            f.write(np.packbits(row).tobytes())
+            written += 1
+    if written != height:
+        os.remove(tmp)
+        raise ValueError('{} rows instead of {}'.format(written, height))
+    os.replace(tmp, path)
+
+def write_grid(path, blocked):
+    # write a blocked array [x][y] as a grid file
+    blocked = np.asarray(blocked, dtype=bool)
+    write_rows(path, blocked.shape[0], blocked.shape[1], blocked.T)
+
+def convert_map(map_path, path=None):
+    # convert a MovingAI .map file to a grid file, streaming line by line
+    path = path or os.path.splitext(map_path)[0] + EXTENSION
+    passable = np.frombuffer(PASSABLE.encode(), dtype=np.uint8)
+    with open(map_path, 'rb') as f:
+        header = {}
+        for line in f:
+            line = line.strip()
+            if line == b'map':
+                break
+            key, value = line.split(None, 1)
+            header[key.decode()] = value.decode()
+        width, height = int(header['width']), int(header['height'])
+        rows = (~np.isin(np.frombuffer(line.rstrip(b'\r\n')[:width], dtype=np.uint8), passable)
+                for line, _ in zip(f, range(height)))
+        write_rows(path, width, height, rows)
+    return path
+
+class MappedGrid:
+    # read only view of a grid file, blocked(x, y) reads a single bit from the mapping
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.width, self.height = HEADER.unpack_from(self.data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError('{} is not a grid file'.format(path))
+        self.stride = (self.width + 7) >> 3
+        if len(self.data) < HEADER.size + self.stride * self.height:
+            raise ValueError('{} is truncated'.format(path))
+        self.shape = (self.width, self.height)
+
+    def close(self):
+        self.data.close()
+
+    def blocked(self, x, y):
+        return self.data[HEADER.size + y * self.stride + (x >> 3)] >> (7 - (x & 7)) & 1
+
+    def search(self, start, goal, alg='UC', lazy=False, record=True):
+        # lets model.search_grid(grid, ...) run on a mapped grid
+        return search(self, start, goal, alg, record)
+
+class Scratch:
+    # search state per node, allocated per tile on first touch
+    def __init__(self, width):
+        self.tiles_x = (width + MASK) >> TILE_BITS
+        self.cost = {}    # tile -> array('f') of TILE * TILE costs, inf if not reached
+        self.parent = {}  # tile -> bytearray with 4 parent codes per byte
+        self.closed = {}  # tile -> bytearray with 8 closed bits per byte
+
+    def tile(self, x, y):
+        t = (y >> TILE_BITS) * self.tiles_x + (x >> TILE_BITS)
+        if t not in self.cost:
+            self.cost[t] = array.array('f', [math.inf]) * (TILE * TILE)
+            self.parent[t] = bytearray(TILE * TILE // 4)
+            self.closed[t] = bytearray(TILE * TILE // 8)
+        return t, (y & MASK) << TILE_BITS | (x & MASK)
+
+    def get_cost(self, x, y):
+        t = (y >> TILE_BITS) * self.tiles_x + (x >> TILE_BITS)
+        tile = self.cost.get(t)
+        return math.inf if tile is None else tile[(y & MASK) << TILE_BITS | (x & MASK)]
+
+    def set(self, x, y, cost, direction):
+        t, i = self.tile(x, y)
+        self.cost[t][i] = cost
+        shift = (i & 3) << 1
+        codes = self.parent[t]
+        codes[i >> 2] = codes[i >> 2] & ~(3 << shift) | direction << shift
+
+    def get_parent(self, x, y):
+        t, i = self.tile(x, y)
+        dx, dy = STEPS[self.parent[t][i >> 2] >> ((i & 3) << 1) & 3]
+        return x + dx, y + dy
+
+    def is_closed(self, x, y):
+        t, i = self.tile(x, y)
+        return self.closed[t][i >> 3] >> (i & 7) & 1
+
+    def set_closed(self, x, y, closed):
+        t, i = self.tile(x, y)
+        if closed:
+            self.closed[t][i >> 3] |= 1 << (i & 7)
+        else:
+            self.closed[t][i >> 3] &= ~(1 << (i & 7))
+
+    def nbytes(self):
+        return len(self.cost) * TILE * TILE * (4 + 1 / 4 + 1 / 8)
+
+def search(grid, start, goal, alg='UC', record=True):
+    """Uniform cost or A* search on a MappedGrid, with the same result as search_grid
+       (a SearchResult with path, cost, explored edges and the event log).
+    """
+    global scratch_bytes
+    if alg not in ('UC', 'A*'):
+        raise ValueError('out of core grids support UC and A*, not {}'.format(alg))
+    width, height = grid.shape
+    blocked = grid.blocked
+    state = Scratch(width)
+    gx, gy = goal
+    astar = alg == 'A*'
+
+    log = array.array('i')
+    total_explored = 0
+    sx, sy = start
+    state.set(sx, sy, 0, 0)
+    # (f, -g, x, y): ties on f go to the deepest node; nodes are queued again when their
+    # cost drops, outdated entries are skipped
+    queue = [(abs(sx - gx) + abs(sy - gy) if astar else 0, 0, sx, sy)]
+    while queue:
+        _, g, x, y = heapq.heappop(queue)
+        g = -g
+        if g > state.get_cost(x, y) or state.is_closed(x, y):
+            continue
+        state.set_closed(x, y, True)
+        if record: log.extend((EXPAND, x, y, -1, -1))
+        if x == gx and y == gy:
+            break
+
+        new_cost = g + 1
+        # the parent of the neighbour in direction d is in the opposite direction d ^ 1
+        for direction, (dx, dy) in enumerate(STEPS):
+            nx, ny = x + dx, y + dy
+            if not (0 <= nx < width and 0 <= ny < height) or blocked(nx, ny):
+                continue
+            old_cost = state.get_cost(nx, ny)
+            if new_cost >= old_cost and state.is_closed(nx, ny):
+                continue
+            if record: log.extend((RELAX, x, y, nx, ny))
+            total_explored += 1
+            if new_cost < old_cost:
+                state.set(nx, ny, new_cost, direction ^ 1)
+                state.set_closed(nx, ny, False)
+                heapq.heappush(queue, (new_cost + (abs(nx - gx) + abs(ny - gy) if astar else 0), -new_cost, nx, ny))
+
+    path = None
+    total_cost = None
+    if state.get_cost(gx, gy) != math.inf:
+        total_cost = int(state.get_cost(gx, gy))
+        x, y = goal
+        path = [(x, y)]
+        while (x, y) != (sx, sy):
+            px, py = state.get_parent(x, y)
+            if record: log.extend((PATH, x, y, px, py))
+            x, y = px, py
+            path.append((x, y))
+        path.reverse()
+
+    scratch_bytes = state.nbytes()
+    events = np.frombuffer(log, dtype=np.int32).reshape(-1, 5) if record else None
+    return SearchResult(path, total_cost, total_explored, events)
+
+def main():
+    parser = argparse.ArgumentParser(description='out of core grid files')
+    parser.add_argument('grid', help='grid file, or .map file to convert first')
+    parser.add_argument('--start', type=int, nargs=2, metavar=('X', 'Y'), default=(0, 0))
+    parser.add_argument('--goal', type=int, nargs=2, metavar=('X', 'Y'))
+    parser.add_argument('--alg', default='A*', choices=('UC', 'A*'))
+    args = parser.parse_args()
+
+    path = args.grid
+    if path.endswith('.map'):
+        path = convert_map(path)
+        print('converted to', path)
+    grid = MappedGrid(path)
+    goal = tuple(args.goal) if args.goal else (grid.width - 1, grid.height - 1)
+
+    t = time.perf_counter()
+    result = search(grid, tuple(args.start), goal, args.alg, record=False)
+    print('{} x {} grid, {} search in {:.2f} s'.format(grid.width, grid.height, args.alg, time.perf_counter() - t))
+    print('cost:', result.cost, 'explored:', result.explored)
+    print('search state: {:.1f} MB (a full grid would need {:.1f} MB)'.format(
+          scratch_bytes / 2**20, grid.width * grid.height * 9 / 2**20))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+import base64
+import tkinter as tk
+import numpy as np
+
+# Raster rendering of the grid for large grids.
+#
+# Instead of one canvas item per line, node and explored edge, the grid is drawn into an
+# off-screen NumPy RGB buffer with one square of `scale` pixels per node. The buffer is
+# divided in tiles; drawing marks tiles dirty and flush() copies only the dirty tiles
+# into a single Tk PhotoImage. The canvas holds one item however large the search.
+
+TILE = 64 # tile size in pixels
+
+class RasterBuffer:
+    # the off-screen image, independent of Tk
+    def __init__(self, size, scale, background):
+        self.size = size
+        self.scale = scale
+        self.pixels = size * scale
+        self.image = np.empty((self.pixels, self.pixels, 3), dtype=np.uint8)
+        self.background = background
+        self.dirty = set()
+        self.clear()
+
+    def clear(self, grid_color=None):
+        self.image[:] = self.background
+        if grid_color is not None and self.scale >= 6:
+            # thin grid lines between the node squares
+            self.image[::self.scale, :] = grid_color
+            self.image[:, ::self.scale] = grid_color
+        tiles = range(0, self.pixels, TILE)
+        self.dirty = {(tx, ty) for tx in tiles for ty in tiles}
+
+    def fill(self, px0, py0, px1, py1, color):
+        # fill the pixel rectangle [px0, px1) x [py0, py1), rows are y and columns are x
+        px0, py0 = max(px0, 0), max(py0, 0)
+        px1, py1 = min(px1, self.pixels), min(py1, self.pixels)
+        if px0 >= px1 or py0 >= py1:
+            return
+        self.image[py0:py1, px0:px1] = color
+        for tx in range(px0 - px0 % TILE, px1, TILE):
+            for ty in range(py0 - py0 % TILE, py1, TILE):
+                self.dirty.add((tx, ty))
+
+    def fill_node(self, node, color):
+        x, y = node
+        s = self.scale
+        self.fill(x * s, y * s, (x + 1) * s, (y + 1) * s, color)
+
+    def draw_edge(self, x0, y0, x1, y1, color):
+        # a straight horizontal or vertical line between the centres of two nodes
+        s = self.scale
+        width = max(1, s // 4)
+        cx0, cy0 = x0 * s + s // 2, y0 * s + s // 2
+        cx1, cy1 = x1 * s + s // 2, y1 * s + s // 2
+        self.fill(min(cx0, cx1) - width // 2, min(cy0, cy1) - width // 2,
+                  max(cx0, cx1) + (width + 1) // 2, max(cy0, cy1) + (width + 1) // 2, color)
+
+    def take_dirty(self):
+        # yields (x, y, ppm image data) for every dirty tile and marks them clean
+        for tx, ty in sorted(self.dirty):
+            tile = self.image[ty:ty + TILE, tx:tx + TILE]
+            header = 'P6 {} {} 255 '.format(tile.shape[1], tile.shape[0]).encode()
+            yield tx, ty, header + tile.tobytes()
+        self.dirty = set()
+
+class TkRaster:
+    # draws a RasterBuffer on a Tk canvas as one PhotoImage
+    def __init__(self, canvas, size, scale, offset, background, grid_color):
+        self.canvas = canvas
+        self.colors = {}
+        self.grid_color = grid_color
+        self.buffer = RasterBuffer(size, scale, self.rgb(background))
+        self.photo = tk.PhotoImage(width=self.buffer.pixels, height=self.buffer.pixels)
+        self.item = canvas.create_image(offset, offset, image=self.photo, anchor='nw')
+
+    def rgb(self, color):
+        # Tk colour name or #rrggbb -> (r, g, b)
+        if color not in self.colors:
+            r, g, b = self.canvas.winfo_rgb(color)
+            self.colors[color] = (r >> 8, g >> 8, b >> 8)
+        return self.colors[color]
+
+    def clear(self):
+        self.buffer.clear(self.rgb(self.grid_color))
+        self.flush()
+
+    def plot_node(self, node, color):
+        self.buffer.fill_node(node, self.rgb(color))
+
+    def plot_line_segment(self, x0, y0, x1, y1, color):
+        self.buffer.draw_edge(x0, y0, x1, y1, self.rgb(color))
+
+    def flush(self):
+        # blit only the dirty tiles into the photo image
+        for x, y, ppm in self.buffer.take_dirty():
+            tile = tk.PhotoImage(data=base64.b64encode(ppm), format='ppm')
+            self.photo.tk.call(self.photo, 'copy', tile, '-to', x, y)
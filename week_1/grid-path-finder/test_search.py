@@ -0,0 +1,102 @@
+import math
+import numpy as np
+import model as mo
+from hierarchical import HierarchicalGrid
+from incremental import DStarLite
+from landmarks import Landmarks, bfs_distances
+
+# Checks of the grid planners against a plain BFS on random grids.
+# Run with pytest, or as a script: python test_search.py
+
+SIZE = 40
+SEEDS = range(20)
+
+def random_grid(seed, size=SIZE, prob=0.3):
+    # a random blocked array [x][y] with free corners, plus a start and goal
+    rng = np.random.default_rng(seed)
+    blocked = rng.random((size, size)) < prob
+    start = tuple(int(v) for v in rng.integers(size, size=2))
+    goal = tuple(int(v) for v in rng.integers(size, size=2))
+    blocked[start] = blocked[goal] = False
+    return blocked, start, goal
+
+def bfs_cost(blocked, start, goal):
+    # nr of steps of the shortest path, None if goal can't be reached
+    walls = np.ascontiguousarray(blocked, dtype=np.uint8)
+    width, height = walls.shape
+    d = bfs_distances(walls.tobytes(), width, height, start[0] * height + start[1])[goal[0] * height + goal[1]]
+    return None if d == math.inf else int(d)
+
+def check_path(blocked, path, start, goal, cost):
+    # path is a list of free, 4-connected nodes from start to goal with cost steps
+    if cost is None:
+        assert path is None
+        return
+    assert path[0] == start and path[-1] == goal
+    assert len(path) == cost + 1
+    for (x0, y0), (x1, y1) in zip(path, path[1:]):
+        assert abs(x0 - x1) + abs(y0 - y1) == 1
+        assert not blocked[x1, y1]
+
+def test_jps_equals_bfs():
+    for seed in SEEDS:
+        blocked, start, goal = random_grid(seed)
+        expected = bfs_cost(blocked, start, goal)
+        result = mo.search_grid(blocked, start, goal, 'JPS', record=False)
+        assert result.cost == expected, seed
+        check_path(blocked, result.path, start, goal, expected)
+
+def test_alt_equals_bfs():
+    for seed in SEEDS:
+        blocked, start, goal = random_grid(seed)
+        landmarks = Landmarks.build(blocked, 4, seed=seed)
+        expected = bfs_cost(blocked, start, goal)
+        result = mo.search_grid(blocked, start, goal, 'ALT', record=False, landmarks=landmarks)
+        assert result.cost == expected, seed
+        check_path(blocked, result.path, start, goal, expected)
+
+def test_dstar_lite_equals_bfs_after_updates():
+    for seed in SEEDS:
+        blocked, start, goal = random_grid(seed)
+        planner = DStarLite(blocked, start, goal)
+        rng = np.random.default_rng(seed)
+        for _ in range(5):
+            path, cost = planner.plan()
+            assert cost == bfs_cost(blocked, start, goal), seed
+            check_path(blocked, path, start, goal, cost)
+            # block and free a few random cells, never the start or goal
+            changes = []
+            for _ in range(10):
+                node = tuple(int(v) for v in rng.integers(SIZE, size=2))
+                if node not in (start, goal):
+                    blocked[node] = not blocked[node]
+                    changes.append((node, blocked[node]))
+            planner.update_cells(changes)
+
+def test_hpa_valid_after_updates():
+    # HPA* is near optimal: a valid path when BFS finds one, never shorter than BFS
+    for seed in SEEDS:
+        blocked, start, goal = random_grid(seed)
+        planner = HierarchicalGrid(blocked, 8)
+        rng = np.random.default_rng(seed)
+        for _ in range(5):
+            path, cost = planner.find_path(start, goal)
+            expected = bfs_cost(blocked, start, goal)
+            assert (cost is None) == (expected is None), seed
+            if cost is not None:
+                assert cost >= expected, seed
+            check_path(blocked, path, start, goal, cost)
+            assert mo.search_grid(blocked, start, goal, 'HPA', record=False, hierarchy=planner).cost == cost
+            changes = []
+            for _ in range(10):
+                node = tuple(int(v) for v in rng.integers(SIZE, size=2))
+                if node not in (start, goal):
+                    blocked[node] = not blocked[node]
+                    changes.append((node, blocked[node]))
+            planner.update_cells(changes)
+
+if __name__ == '__main__':
+    for name, test in list(globals().items()):
+        if name.startswith('test_'):
+            test()
+            print(name, 'ok')
@@ -1,12 +1,179 @@
-longestWordLength = 0
-longestWord = ""
-
-with open('words_NL.txt','r') as file:
-    for line in file:
-        for word in line.split():
-           if (len(word) > longestWordLength):
-            longestWordLength = len(word)
-            longestWord = word
-
-print(longestWordLength)
-print(longestWord)
\ No newline at end of file
+import argparse
+import mmap
+import multiprocessing
+import os
+import re
+import time
+from collections import Counter
+import numpy as np
+
+# Lexicon statistics in a single pass over a (huge) word list.
+# The file is split into chunks that end on whitespace, every chunk is memory mapped and
+# scanned with NumPy by a worker process, and the partial results are merged afterwards.
+# All per-byte work happens inside NumPy, so the scan runs at memory/disk speed instead
+# of interpreter speed. Lengths and letters are counted in bytes, which equals characters
+# for single byte encodings like words_NL.txt (latin-1).
+
+WHITESPACE = re.compile(rb'\s')
+CHUNK_SIZE = 64 * 1024 * 1024
+
+def chunk_bounds(path, chunk_size=CHUNK_SIZE):
+    # split the file in (start, end) byte ranges of about chunk_size, every range
+    # ends on a whitespace byte so no word is cut in two
+    size = os.path.getsize(path)
+    if size == 0:
+        return []
+
+    bounds = []
+    with open(path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        start = 0
+        while start < size:
+            end = min(start + chunk_size, size)
+            while end < size:
+                match = WHITESPACE.search(mm, end, min(end + 4096, size))
+                if match:
+                    end = match.start()
+                    break
+                end = min(end + 4096, size)
+            bounds.append((start, end))
+            start = end
+    return bounds
+
+def scan_chunk(args):
+    # statistics of one chunk:
+    #   lengths   histogram, lengths[n] = nr of words of n bytes
+    #   letters   count of every (non whitespace) byte value
+    #   top       the top_k longest words as (length, -position, word)
+    #   prefixes  Counter prefix -> nr of words starting with it
+    path, start, end, top_k, prefix_len = args
+    with open(path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        buf = np.frombuffer(mm, dtype=np.uint8, count=end - start, offset=start)
+        space = (buf == 32) | ((buf >= 9) & (buf <= 13))
+
+        letters = np.bincount(buf, minlength=256)
+        letters[[9, 10, 11, 12, 13, 32]] = 0
+
+        # words are the runs of non whitespace bytes
+        edges = np.diff((~space).view(np.int8), prepend=np.int8(0), append=np.int8(0))
+        starts = np.flatnonzero(edges == 1)
+        ends = np.flatnonzero(edges == -1)
+        lengths = ends - starts
+
+        # top k: ordered by length, ties broken by first occurrence in the file; the
+        # words of at least the k-th largest length are the candidates, when duplicates
+        # leave fewer than k different words the cut is lowered and tried again
+        top = []
+        k = top_k
+        while len(lengths) > 0 and top_k > 0:
+            k = min(k, len(lengths))
+            cut = np.partition(lengths, -k)[-k]
+            top = top_words([(int(lengths[i]), -(start + int(starts[i])), bytes(buf[starts[i]:ends[i]]))
+                             for i in np.flatnonzero(lengths >= cut)], top_k)
+            if len(top) == top_k or k == len(lengths):
+                break
+            k *= 2
+
+        # prefix counts, the first prefix_len bytes of every word packed in one integer
+        prefixes = Counter()
+        if prefix_len > 0:
+            first = starts[lengths >= prefix_len]
+            keys = np.zeros(len(first), dtype=np.uint64)
+            for i in range(prefix_len):
+                keys = (keys << np.uint64(8)) | buf[first + i].astype(np.uint64)
+            for key, count in zip(*np.unique(keys, return_counts=True)):
+                prefixes[int(key).to_bytes(prefix_len, 'big')] = int(count)
+
+        histogram = np.bincount(lengths)
+        del buf
+    return histogram, letters, top, prefixes
+
+def top_words(candidates, top_k):
+    # the top_k largest (length, -position, word) candidates with different words, a
+    # word that occurs more than once keeps its first position
+    top = []
+    seen = set()
+    for candidate in sorted(candidates, reverse=True):
+        if candidate[2] not in seen:
+            seen.add(candidate[2])
+            top.append(candidate)
+            if len(top) == top_k:
+                break
+    return top
+
+def merge(results, top_k):
+    # combine the partial results of all chunks
+    histogram = np.zeros(1, dtype=np.int64)
+    letters = np.zeros(256, dtype=np.int64)
+    top = []
+    prefixes = Counter()
+    for chunk_histogram, chunk_letters, chunk_top, chunk_prefixes in results:
+        if len(chunk_histogram) > len(histogram):
+            histogram = np.pad(histogram, (0, len(chunk_histogram) - len(histogram)))
+        histogram[:len(chunk_histogram)] += chunk_histogram
+        letters += chunk_letters
+        top = top_words(top + chunk_top, top_k)
+        prefixes.update(chunk_prefixes)
+    return histogram, letters, top, prefixes
+
+def decode(word):
+    try:
+        return word.decode('utf-8')
+    except UnicodeDecodeError:
+        return word.decode('latin-1')
+
+def lexicon_stats(path, top_k=10, prefix_len=2, processes=None, chunk_size=CHUNK_SIZE):
+    # Returns a dict with the statistics of the word list in path:
+    #   words, lengths {length: count}, longest [words], letters {letter: count},
+    #   prefixes {prefix: count}
+    jobs = [(path, start, end, top_k, prefix_len) for start, end in chunk_bounds(path, chunk_size)]
+    if processes == 1 or len(jobs) <= 1:
+        results = map(scan_chunk, jobs)
+        histogram, letters, top, prefixes = merge(results, top_k)
+    else:
+        with multiprocessing.Pool(processes) as pool:
+            histogram, letters, top, prefixes = merge(pool.imap_unordered(scan_chunk, jobs), top_k)
+
+    return {
+        'words': int(histogram.sum()),
+        'lengths': {length: int(count) for length, count in enumerate(histogram) if count},
+        'longest': [decode(word) for length, position, word in top],
+        'letters': {decode(bytes([byte])): int(count) for byte, count in enumerate(letters) if count},
+        'prefixes': {decode(prefix): count for prefix, count in prefixes.items()},
+    }
+
+def print_stats(stats, top_prefixes=20):
+    print('words:', stats['words'])
+    print('\nlength histogram:')
+    for length, count in sorted(stats['lengths'].items()):
+        print('{:>4} {}'.format(length, count))
+    print('\nlongest words:')
+    for word in stats['longest']:
+        print('{:>4} {}'.format(len(word), word))
+    print('\nletter frequencies:')
+    for letter, count in sorted(stats['letters'].items(), key=lambda item: -item[1]):
+        print('{:>4} {}'.format(letter, count))
+    print('\nmost common prefixes:')
+    for prefix, count in Counter(stats['prefixes']).most_common(top_prefixes):
+        print('{:>4} {}'.format(prefix, count))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Longest word and other statistics of a word list.')
+    parser.add_argument('path', nargs='?', default='words_NL.txt')
+    parser.add_argument('--stats', action='store_true', help='print all statistics, not only the longest word')
+    parser.add_argument('--top', type=int, default=10, help='nr of longest words to keep')
+    parser.add_argument('--prefix', type=int, default=2, help='prefix length to count (max 8)')
+    parser.add_argument('--processes', type=int, default=None, help='worker processes (default: nr of cpus)')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE // (1024 * 1024), help='chunk size in MB')
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    stats = lexicon_stats(args.path, args.top, min(args.prefix, 8) if args.stats else 0,
+                          args.processes, args.chunk_size * 1024 * 1024)
+    t1 = time.perf_counter()
+
+    if args.stats:
+        print_stats(stats)
+        print('\nscanned {} in {:.2f} secs'.format(args.path, t1 - t0))
+    elif stats['longest']:
+        print(len(stats['longest'][0]))
+        print(stats['longest'][0])
@@ -1,41 +1,150 @@
-import copy
+import argparse
+import itertools
+import random
+import time
+from collections import deque
+
+class RiverCrossing:
+    # A generalised river-crossing (transport) puzzle.
+    #   items      names of the items, all start on the left bank
+    #   capacity   nr of places in the boat (pilot included)
+    #   conflicts  groups of items that can't be together on a bank unless it is guarded
+    #   pilot      item that has to be in the boat on every crossing (None: anyone can row)
+    #   guards     items that prevent conflicts on their bank (default: the pilot)
+    #   symmetric  search one state per class of interchangeable items (see below)
+    #
+    # A state is a single int: bit i is set when item i is on the right bank and the bit
+    # after the items is set when the boat is on the right bank. Copying, comparing and
+    # hashing a state are O(1) and the bank safety checks are memoized per bank.
+    #
+    # Items that can be swapped without changing the puzzle (the same conflicts with the
+    # same other items, e.g. all items without conflicts) form a class. Only one state per
+    # distribution of the class over the banks is searched: the items of a class on the
+    # right bank are always the first ones of the class. A load takes a number of items
+    # of every class, from the front of the left items or the back of the right items, so
+    # the states stay in that form. With few conflicts this leaves a few hundred states
+    # instead of 2^n. Solutions that only differ in swapped items are then found once,
+    # so it is off by default (dfs prints all solutions).
+    def __init__(self, items, capacity=2, conflicts=(), pilot=None, guards=None, symmetric=False):
+        self.items = list(items)
+        self.capacity = capacity
+        self.pilot = pilot
+        self.bit = {item: 1 << i for i, item in enumerate(self.items)}
+        self.all = (1 << len(self.items)) - 1
+        self.boat = 1 << len(self.items)
+        self.conflicts = [self.mask(group) for group in conflicts]
+        if guards is None:
+            guards = [] if pilot is None else [pilot]
+        self.guards = self.mask(guards)
+        self.safe_banks = {}
+        self.classes = self.item_classes(symmetric)
+
+        self.start = 0
+        self.goal = self.all | self.boat
+
+    def mask(self, items):
+        mask = 0
+        for item in items:
+            mask |= self.bit[item]
+        return mask
+
+    def item_classes(self, symmetric):
+        # the bits of the items (but the pilot) grouped by the conflicts they are in, seen
+        # from the item: the groups without the item itself; one item per class if not
+        # symmetric
+        classes = {}
+        for item, bit in self.bit.items():
+            if item == self.pilot:
+                continue
+            key = (bool(bit & self.guards), frozenset(group ^ bit for group in self.conflicts if group & bit))
+            if not symmetric:
+                key = bit
+            classes.setdefault(key, []).append(bit)
+        return list(classes.values())
+
+    def bank_safe(self, bank):
+        safe = self.safe_banks.get(bank)
+        if safe is None:
+            safe = bool(bank & self.guards) or not any(bank & group == group for group in self.conflicts)
+            self.safe_banks[bank] = safe
+        return safe
+
+    def is_safe(self, state):
+        right = state & self.all
+        return self.bank_safe(right) and self.bank_safe(self.all ^ right)
+
+    def is_goal(self, state):
+        return state & self.all == self.all
+
+    def loads(self, state):
+        # all groups of items that can cross together from the bank the boat is on and
+        # leave both banks safe; unsafe loads are skipped before a child state is made
+        right = state & self.all
+        from_right = state & self.boat
+        side, other = (right, self.all ^ right) if from_right else (self.all ^ right, right)
+        base, room = 0, self.capacity
+        if self.pilot is not None:
+            base = self.bit[self.pilot]
+            if not side & base:
+                return
+            room -= 1
+        # (load, size) for every choice of how many items of the classes cross
+        groups = [(base, 0)]
+        for bits in self.classes:
+            bits = [bit for bit in bits if side & bit]
+            if from_right:
+                bits.reverse()
+            parts = [0]
+            for bit in bits[:room]:
+                parts.append(parts[-1] | bit)
+            groups += [(load | part, size + k) for k, part in enumerate(parts) if k
+                       for load, size in groups if size + k <= room]
+        # smallest loads first, like itertools.combinations
+        groups.sort(key=lambda group: group[1])
+        bank_safe = self.bank_safe
+        for load, size in groups:
+            if load and bank_safe(side ^ load) and bank_safe(other | load):
+                yield load
+
+    def play(self, state, load):
+        return state ^ load ^ self.boat
+
+    def format_state(self, state):
+        left = "".join(item for item in self.items if not state & self.bit[item])
+        right = "".join(item for item in self.items if state & self.bit[item])
+        if self.pilot is None:
+            # without a pilot the boat side isn't implied by the items, mark it with a *
+            return left + ("|*" if state & self.boat else "*|") + right
+        return left + "|" + right
+
+# The classic puzzle: farmer, goat, cabbage and wolf, the farmer rows and takes one item.
+FARMER = RiverCrossing(['F', 'G', 'C', 'W'], capacity=2, conflicts=[('G', 'C'), ('G', 'W')], pilot='F')
 
 class Node:
-    def __init__(self, state, parent=None):
+    def __init__(self, state=0, parent=None, puzzle=FARMER):
         self.parent = parent
         self.state = state
+        self.puzzle = puzzle
 
     def game_over(self):
-        if len(self.state[0]) == 0:
+        if self.puzzle.is_goal(self.state):
             return True, True
 
-        cur, tar = self.find('F')
-        if ('C' in self.state[tar] and 'G' in self.state[tar]) or ('G' in self.state[tar] and 'W' in self.state[tar]):
+        if not self.puzzle.is_safe(self.state):
             return True, False
-        
+
         return False, False
 
     def get_valid_moves(self):
-        cur, tar = self.find('F')
-        moves = self.state[cur]
-        return moves
-
-    def play(self, o):
-        self.move(o)
-        if o != 'F': self.move('F')
-
-    def find(self, o):
-        return [0, 1] if o in self.state[0] else [1, 0]
+        # moves are bitmasks of the items that cross together
+        return list(self.puzzle.loads(self.state))
 
-    def move(self, o):
-        cur, tar = self.find(o)
-        self.state[cur].remove(o)
-        self.state[tar].append(o)
+    def play(self, load):
+        # returns the child node after the load crossed the river
+        return Node(self.puzzle.play(self.state, load), self, self.puzzle)
 
     def print_state(self):
-        left = "".join(self.state[0])
-        right = "".join(self.state[1])
-        return left + "|" + right
+        return self.puzzle.format_state(self.state)
 
     def print_history(self):
         string = self.print_state()
@@ -46,30 +155,98 @@ class Node:
         print(string)
 
     def equals(self, node):
-        return all(elem in node.state[0] for elem in self.state[0]) and all(elem in node.state[1] for elem in self.state[1])
+        return self.state == node.state
 
 def dfs(node, visited, depth=0):
+    # Prints all solutions. visited maps state -> smallest depth it was reached at.
     game_over, won = node.game_over()
-    
+
     if won:
         # This is a solution!
         node.print_history()
-    elif not game_over and not any(node.equals(visited_node[0]) and depth > visited_node[1] for visited_node in visited):
+    elif not game_over and not visited.get(node.state, depth) < depth:
         # Only keep searching if game is not over and we haven't visited this position yet
-        visited.append((node, depth))
+        visited[node.state] = depth
         # Explore all moves
         for move in node.get_valid_moves():
-            # A deep copy of the state is necessary because list.copy() only copies outer list
-            new_node = Node(copy.deepcopy(node.state), node)
-            new_node.play(move)
-            dfs(new_node, visited, depth+1)
+            dfs(node.play(move), visited, depth+1)
+
+def bfs(node):
+    # Returns the goal node of a shortest solution, or None if there is no solution.
+    # Only ints are stored per state (parent state in a dict), the goal Node chain is
+    # rebuilt at the end.
+    puzzle = node.puzzle
+    parents = {node.state: None}
+    queue = deque([node.state])
+    while queue:
+        state = queue.popleft()
+        if puzzle.is_goal(state):
+            path = []
+            while state is not None:
+                path.append(state)
+                state = parents[state]
+            goal = None
+            for state in reversed(path):
+                goal = Node(state, goal, puzzle)
+            return goal
+        if not puzzle.is_safe(state):
+            continue
+        for load in puzzle.loads(state):
+            child = puzzle.play(state, load)
+            if child not in parents:
+                parents[child] = state
+                queue.append(child)
+    return None
+
+def random_puzzle(n, capacity, nr_conflicts, seed=None):
+    # Benchmark instance: n items and a farmer F who rows the boat, with nr_conflicts
+    # random pairs of items that can't be left alone together. Random pairs almost always
+    # give an unsolvable puzzle (the first trip leaves a conflict behind), so every pair
+    # contains one of capacity - 2 random "key" items. The farmer can keep all keys in
+    # the boat and ferry the other items with the free place, so the puzzle is always
+    # solvable. With a boat for 2 there is one key with at most 2 partners, the goat of
+    # the classic puzzle, that is shuttled back and forth.
+    rng = random.Random(seed)
+    items = ['F'] + [str(i) for i in range(n)]
+    if capacity < 3:
+        key, *partners = rng.sample(items[1:], min(3, n))
+        pairs = [(key, partner) for partner in partners]
+    else:
+        keys = rng.sample(items[1:], min(capacity - 2, n))
+        pairs = [pair for pair in itertools.combinations(items[1:], 2) if pair[0] in keys or pair[1] in keys]
+    conflicts = rng.sample(pairs, min(nr_conflicts, len(pairs)))
+    return RiverCrossing(items, capacity, conflicts, pilot='F', symmetric=True)
 
 if __name__ == '__main__':
-    # Starting state: Farmer, Goat, Cabbage and Wolf on the left side. Right side is empty.
-    node = Node([['F', 'G', 'C', 'W'], []])
-    # Start searching for solutions
-    dfs(node, [], 0)
+    parser = argparse.ArgumentParser(description='Solve river crossing puzzles.')
+    parser.add_argument('--random', type=int, metavar='N', help='solve a random puzzle with N items')
+    parser.add_argument('--capacity', type=int, default=3, help='boat capacity for --random')
+    parser.add_argument('--conflicts', type=int, default=None, help='nr of conflicting pairs for --random')
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    if args.random:
+        conflicts = args.conflicts if args.conflicts is not None else args.random // 2
+        puzzle = random_puzzle(args.random, args.capacity, conflicts, args.seed)
+        t0 = time.perf_counter()
+        goal = bfs(Node(puzzle.start, puzzle=puzzle))
+        t1 = time.perf_counter()
+        if goal is None:
+            print('no solution')
+        else:
+            goal.print_history()
+        print('solved in {:.2f} secs'.format(t1 - t0))
+    else:
+        # Starting state: Farmer, Goat, Cabbage and Wolf on the left side. Right side is empty.
+        node = Node(FARMER.start)
+        # Start searching for solutions
+        dfs(node, {}, 0)
+        # Shortest solution
+        print('shortest:')
+        bfs(node).print_history()
 
 # Time complexity: O(b^D)
 # b = branching factor:  4
-# D = max depth: 7
\ No newline at end of file
+# D = max depth: 7
+# With the hashed visited set every state is expanded at most once per depth (dfs) or
+# once in total (bfs), so bfs is O(2^(n+1) * b) for n items.
@@ -0,0 +1,317 @@
+import heapq
+import time
+from collections import deque, namedtuple
+
+# Reusable state-space search.
+#
+# A problem implements the Problem interface below; the engines (bfs, iddfs,
+# bidirectional, astar) only use that interface. States have to be hashable, and
+# Problem.key(state) can map a state onto a smaller hashable key (by default the state
+# itself). Frontiers store keys, parents are kept in one dict key -> parent key, so a
+# search allocates no node objects.
+#
+# Every engine returns a SearchResult with the path (list of states from the initial
+# state to the goal, None if there is no solution), its cost, the nr of expanded
+# nodes and the time it took.
+
+class SearchResult(namedtuple('SearchResult', 'path cost expanded seconds')):
+    @property
+    def nodes_per_sec(self):
+        return self.expanded / self.seconds if self.seconds > 0 else float('inf')
+
+    def __str__(self):
+        cost = 'no solution' if self.path is None else 'cost {}'.format(self.cost)
+        return '{}, {} expanded in {:.3f} secs ({:.0f} nodes/sec)'.format(
+            cost, self.expanded, self.seconds, self.nodes_per_sec)
+
+class Problem:
+    def initial(self):
+        raise NotImplementedError
+
+    def successors(self, state):
+        # iterable of (next state, step cost)
+        raise NotImplementedError
+
+    def is_goal(self, state):
+        raise NotImplementedError
+
+    def key(self, state):
+        return state
+
+    def heuristic(self, state):
+        # estimated cost to a goal, must not overestimate for astar to be optimal
+        return 0
+
+    def goal(self):
+        # the single goal state, only needed for bidirectional search
+        raise NotImplementedError
+
+    def predecessors(self, state):
+        # iterable of (previous state, step cost), by default moves are reversible
+        return self.successors(state)
+
+def make_path(parents, states, key):
+    path = []
+    while key is not None:
+        path.append(states[key])
+        key = parents[key]
+    path.reverse()
+    return path
+
+def path_cost(problem, path):
+    cost = 0
+    for state, next_state in zip(path, path[1:]):
+        next_key = problem.key(next_state)
+        cost += min(c for s, c in problem.successors(state) if problem.key(s) == next_key)
+    return cost
+
+def bfs(problem):
+    # breadth first search, shortest path in nr of steps
+    t0 = time.perf_counter()
+    start = problem.initial()
+    key = problem.key(start)
+    parents = {key: None}
+    states = {key: start}
+    queue = deque([key])
+    expanded = 0
+
+    while queue:
+        key = queue.popleft()
+        state = states[key]
+        if problem.is_goal(state):
+            path = make_path(parents, states, key)
+            return SearchResult(path, path_cost(problem, path), expanded, time.perf_counter() - t0)
+        expanded += 1
+        for child, cost in problem.successors(state):
+            child_key = problem.key(child)
+            if child_key not in parents:
+                parents[child_key] = key
+                states[child_key] = child
+                queue.append(child_key)
+
+    return SearchResult(None, None, expanded, time.perf_counter() - t0)
+
+def iddfs(problem, max_depth=100):
+    # iterative deepening depth first search, shortest path in nr of steps with memory
+    # linear in the depth; the DFS uses an explicit stack and skips states on the path
+    t0 = time.perf_counter()
+    expanded = 0
+    start = problem.initial()
+
+    for limit in range(max_depth + 1):
+        path = [start]
+        on_path = {problem.key(start)}
+        stack = [iter(problem.successors(start))]
+        if problem.is_goal(start):
+            return SearchResult(path, 0, expanded, time.perf_counter() - t0)
+        expanded += 1
+        cutoff = False
+
+        while stack:
+            child = next(stack[-1], None)
+            if child is None:
+                stack.pop()
+                on_path.discard(problem.key(path.pop()))
+                continue
+            state = child[0]
+            key = problem.key(state)
+            if key in on_path:
+                continue
+            if problem.is_goal(state):
+                path.append(state)
+                return SearchResult(path, path_cost(problem, path), expanded, time.perf_counter() - t0)
+            if len(path) <= limit - 1:
+                expanded += 1
+                path.append(state)
+                on_path.add(key)
+                stack.append(iter(problem.successors(state)))
+            else:
+                cutoff = True
+
+        if not cutoff:
+            break
+
+    return SearchResult(None, None, expanded, time.perf_counter() - t0)
+
+def bidirectional(problem):
+    # bidirectional breadth first search from the initial state and the goal state,
+    # always expanding the smallest frontier one level; shortest path in nr of steps
+    t0 = time.perf_counter()
+    start, goal = problem.initial(), problem.goal()
+    start_key, goal_key = problem.key(start), problem.key(goal)
+    states = {start_key: start, goal_key: goal}
+    forward = {start_key: None}
+    backward = {goal_key: None}
+    forward_frontier = [start_key]
+    backward_frontier = [goal_key]
+    expanded = 0
+    meet = start_key if start_key in backward else None
+
+    while meet is None and forward_frontier and backward_frontier:
+        if len(forward_frontier) <= len(backward_frontier):
+            frontier, parents, other, expand = forward_frontier, forward, backward, problem.successors
+        else:
+            frontier, parents, other, expand = backward_frontier, backward, forward, problem.predecessors
+
+        next_frontier = []
+        for key in frontier:
+            expanded += 1
+            for child, cost in expand(states[key]):
+                child_key = problem.key(child)
+                if child_key not in parents:
+                    parents[child_key] = key
+                    states[child_key] = child
+                    next_frontier.append(child_key)
+                    if child_key in other:
+                        meet = child_key
+                        break
+            if meet is not None:
+                break
+
+        if parents is forward:
+            forward_frontier = next_frontier
+        else:
+            backward_frontier = next_frontier
+
+    if meet is None:
+        return SearchResult(None, None, expanded, time.perf_counter() - t0)
+
+    path = make_path(forward, states, meet)
+    key = backward[meet]
+    while key is not None:
+        path.append(states[key])
+        key = backward[key]
+    return SearchResult(path, path_cost(problem, path), expanded, time.perf_counter() - t0)
+
+def astar(problem):
+    # A* search, optimal when the heuristic is admissible (uniform cost search if it is 0)
+    # the heap holds (f, g, counter, key) and outdated entries are skipped when popped
+    t0 = time.perf_counter()
+    start = problem.initial()
+    key = problem.key(start)
+    parents = {key: None}
+    states = {key: start}
+    best = {key: 0}
+    closed = set()
+    heap = [(problem.heuristic(start), 0, 0, key)]
+    counter = 1
+    expanded = 0
+
+    while heap:
+        f, g, _, key = heapq.heappop(heap)
+        if key in closed or g > best[key]:
+            continue
+        state = states[key]
+        if problem.is_goal(state):
+            return SearchResult(make_path(parents, states, key), g, expanded, time.perf_counter() - t0)
+        closed.add(key)
+        expanded += 1
+        for child, cost in problem.successors(state):
+            child_key = problem.key(child)
+            new_g = g + cost
+            if child_key not in closed and new_g < best.get(child_key, float('inf')):
+                best[child_key] = new_g
+                parents[child_key] = key
+                states[child_key] = child
+                heapq.heappush(heap, (new_g + problem.heuristic(child), new_g, counter, child_key))
+                counter += 1
+
+    return SearchResult(None, None, expanded, time.perf_counter() - t0)
+
+ENGINES = {'BFS': bfs, 'IDDFS': iddfs, 'BIDIRECTIONAL': bidirectional, 'A*': astar}
+
+def compare(problem, engines=ENGINES):
+    # run every engine on the problem, returns {name: SearchResult}
+    return {name: engine(problem) for name, engine in engines.items()}
+
+# adapters for the existing puzzles
+
+class RiverCrossingProblem(Problem):
+    # adapter for rivercrossing.RiverCrossing, states are the puzzle's int states
+    def __init__(self, puzzle):
+        self.puzzle = puzzle
+
+    def initial(self):
+        return self.puzzle.start
+
+    def goal(self):
+        return self.puzzle.goal
+
+    def is_goal(self, state):
+        return self.puzzle.is_goal(state)
+
+    def successors(self, state):
+        for load in self.puzzle.loads(state):
+            child = self.puzzle.play(state, load)
+            if self.puzzle.is_safe(child):
+                yield child, 1
+
+    def predecessors(self, state):
+        # the boat brought a load to its current bank, so the loads that can leave that
+        # bank lead back to the possible previous states; an unsafe state has none
+        if not self.puzzle.is_safe(state):
+            return
+        for load in self.puzzle.loads(state):
+            previous = self.puzzle.play(state, load)
+            if self.puzzle.is_safe(previous):
+                yield previous, 1
+
+class GridProblem(Problem):
+    # 4-connected grid with unit step cost, as in grid-path-finder
+    # blocked[x][y] is truthy for blocked cells, states are cell indices x * height + y
+    def __init__(self, blocked, start, goal):
+        self.width = len(blocked)
+        self.height = len(blocked[0])
+        self.blocked = [bool(blocked[x][y]) for x in range(self.width) for y in range(self.height)]
+        self.start = start[0] * self.height + start[1]
+        self.target = goal[0] * self.height + goal[1]
+        self.goal_x, self.goal_y = goal
+
+    @staticmethod
+    def from_model_grid(grid, start, goal):
+        # grid-path-finder's model.grid, where blocked cells have the value 'b'
+        return GridProblem([[value == 'b' for value in column] for column in grid], start, goal)
+
+    def initial(self):
+        return self.start
+
+    def goal(self):
+        return self.target
+
+    def is_goal(self, state):
+        return state == self.target
+
+    def cell(self, state):
+        return divmod(state, self.height)
+
+    def heuristic(self, state):
+        x, y = divmod(state, self.height)
+        return abs(x - self.goal_x) + abs(y - self.goal_y)
+
+    def successors(self, state):
+        x, y = divmod(state, self.height)
+        if x > 0 and not self.blocked[state - self.height]:
+            yield state - self.height, 1
+        if x < self.width - 1 and not self.blocked[state + self.height]:
+            yield state + self.height, 1
+        if y > 0 and not self.blocked[state - 1]:
+            yield state - 1, 1
+        if y < self.height - 1 and not self.blocked[state + 1]:
+            yield state + 1, 1
+
+if __name__ == '__main__':
+    import random
+    import rivercrossing
+
+    print('river crossing (farmer, goat, cabbage, wolf):')
+    for name, result in compare(RiverCrossingProblem(rivercrossing.FARMER)).items():
+        print('  {:<14}{}'.format(name, result))
+
+    random.seed(1)
+    size = 60
+    blocked = [[random.random() < 0.2 for y in range(size)] for x in range(size)]
+    blocked[0][0] = blocked[size - 1][size - 1] = False
+    print('{0}x{0} grid:'.format(size))
+    engines = {name: engine for name, engine in ENGINES.items() if name != 'IDDFS'}
+    for name, result in compare(GridProblem(blocked, (0, 0), (size - 1, size - 1)), engines).items():
+        print('  {:<14}{}'.format(name, result))
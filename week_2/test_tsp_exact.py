@@ -0,0 +1,28 @@
+import itertools
+import math
+import random
+from tsp_exact import held_karp
+
+# Held-Karp against trying all tours, for up to 9 cities.
+# Run with pytest, or as a script: python test_tsp_exact.py
+
+def length(tour):
+    return sum(math.hypot(tour[i][0] - tour[i - 1][0], tour[i][1] - tour[i - 1][1]) for i in range(len(tour)))
+
+def brute_force(cities):
+    # the length of the shortest tour, trying all tours that start with the first city
+    start, rest = cities[0], cities[1:]
+    return min(length([start] + list(tour)) for tour in itertools.permutations(rest))
+
+def test_held_karp_equals_brute_force():
+    rng = random.Random(1)
+    for n in range(1, 10):
+        for _ in range(5):
+            cities = list({(rng.randrange(1000), rng.randrange(1000)) for _ in range(n)})
+            tour = held_karp(cities)
+            assert sorted(tour) == sorted(cities)
+            assert abs(length(tour) - brute_force(cities)) < 1e-6, cities
+
+if __name__ == '__main__':
+    test_held_karp_equals_brute_force()
+    print('test_held_karp_equals_brute_force ok')
@@ -0,0 +1,55 @@
+import random
+import numpy as np
+from tsp_local import Tour, OPERATORS, local_search
+
+# Checks of the local search operators on random cities: after every move the tour is
+# still a permutation of the cities and it got shorter by exactly the reported gain.
+# Run with pytest, or as a script: python test_tsp_local.py
+
+def random_cities(n, seed):
+    rng = random.Random(seed)
+    return [(rng.randrange(1000), rng.randrange(1000)) for _ in range(n)]
+
+def check_tour(t):
+    assert sorted(t.order.tolist()) == list(range(t.n))
+    assert (t.pos[t.order] == np.arange(t.n)).all()
+
+def check_operator(operator, sizes=(8, 9, 30, 200), seeds=range(5)):
+    move = OPERATORS[operator]
+    for n in sizes:
+        for seed in seeds:
+            t = Tour(random_cities(n, seed))
+            length = t.length()
+            moves = 0
+            for a in range(n):
+                result = move(t, a)
+                check_tour(t)
+                if result is not None:
+                    moves += 1
+                    assert abs(length - result[0] - t.length()) < 1e-6, (operator, n, seed)
+                    length = t.length()
+            assert moves > 0 or n < 10
+
+            # the passes of a full local search add up to the total improvement
+            start = t.length()
+            passes = local_search(t, operator)
+            check_tour(t)
+            assert abs(start - sum(p.gain for p in passes) - t.length()) < 1e-6
+
+def test_two_opt():
+    check_operator('2-opt')
+
+def test_or_opt():
+    check_operator('or-opt')
+
+def test_or_2opt():
+    check_operator('or-2opt')
+
+def test_lk():
+    check_operator('lk')
+
+if __name__ == '__main__':
+    for name, test in list(globals().items()):
+        if name.startswith('test_'):
+            test()
+            print(name, 'ok')
@@ -0,0 +1,109 @@
+import argparse
+import random
+import time
+import numpy as np
+
+# Exact TSP solver (Held-Karp dynamic programming), O(2^n n^2) time instead of the O(n!)
+# of trying all tours, fast enough for about 20 cities.
+#
+# The first city is the start. For every subset S of the other cities and every city j
+# in S, cost[S][j] is the length of the shortest path that starts at the first city,
+# visits all cities of S and ends in j:
+#     cost[{j}][j] = d(start, j)
+#     cost[S][j]   = min over i in S - {j} of cost[S - {j}][i] + d(i, j)
+# Subsets are bitmasks. The table is computed layer by layer (all subsets with k cities),
+# each layer only needs the layer before it, so only two layers of costs are kept. Only
+# the best previous city (1 byte) is stored for every layer to rebuild the tour. Within
+# a layer the subsets are numbered by rank[mask], and a whole layer is computed with
+# NumPy operations, one per end city j.
+
+MAX_CITIES = 22 # the parent table has 2^(n-1) (n-1) bytes
+
+def distance_matrix(cities):
+    xy = np.array([(c[0], c[1]) for c in cities], dtype=float)
+    return np.hypot(xy[:, None, 0] - xy[None, :, 0], xy[:, None, 1] - xy[None, :, 1])
+
+def held_karp(cities):
+    # return the shortest tour (list of cities) through the cities
+    cities = list(cities)
+    n = len(cities)
+    if n <= 3:
+        return cities
+    if n > MAX_CITIES:
+        raise ValueError('held_karp solves at most {} cities, not {}'.format(MAX_CITIES, n))
+
+    d = distance_matrix(cities)
+    m = n - 1 # city i (1..m) is bit i - 1 of a subset, city 0 is the start
+    masks = np.arange(1 << m, dtype=np.int64)
+    size = np.zeros(1 << m, dtype=np.int8)
+    for bit in range(m):
+        size += (masks >> bit & 1).astype(np.int8)
+    layers = [masks[size == k] for k in range(m + 1)]
+    rank = np.empty(1 << m, dtype=np.int32)
+    for layer in layers:
+        rank[layer] = np.arange(len(layer), dtype=np.int32)
+
+    # layer 1 holds the subsets {j} in the order of j
+    cost = np.full((m, m), np.inf)
+    cost[np.arange(m), np.arange(m)] = d[0, 1:]
+    parents = [None, None]
+    for k in range(2, m + 1):
+        layer = layers[k]
+        new = np.full((len(layer), m), np.inf)
+        parent = np.zeros((len(layer), m), dtype=np.int8)
+        for j in range(m):
+            rows = np.flatnonzero(layer >> j & 1)
+            # cost of every path through the subset without j, ending in i, then to j
+            # (inf for the i that are not in that subset)
+            total = cost[rank[layer[rows] ^ (1 << j)]] + d[1:, j + 1]
+            best = np.argmin(total, axis=1)
+            new[rows, j] = total[np.arange(len(rows)), best]
+            parent[rows, j] = best
+        cost = new
+        parents.append(parent)
+
+    # close the tour back to the start, then follow the parents back through the layers
+    last = int(np.argmin(cost[0] + d[1:, 0]))
+    mask = (1 << m) - 1
+    order = []
+    for k in range(m, 0, -1):
+        order.append(last + 1)
+        if k > 1:
+            previous = int(parents[k][rank[mask], last])
+            mask ^= 1 << last
+            last = previous
+    order.append(0)
+    order.reverse()
+    return [cities[i] for i in order]
+
+def main():
+    # the gap between the heuristics and the optimal tour on random instances
+    # tsp_start imports this module, so it is only imported here
+    import tsp_start
+
+    parser = argparse.ArgumentParser(description='optimal tours with Held-Karp as ground truth for the heuristics')
+    parser.add_argument('n', type=int, help='nr of cities (at most {})'.format(MAX_CITIES))
+    parser.add_argument('--trials', type=int, default=10, help='nr of random instances (default 10)')
+    parser.add_argument('--seed', type=int, help='seed of the random cities')
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    methods = [('nn', []), ('nn -> ' + ' -> '.join(tsp_start.PIPELINE), tsp_start.PIPELINE), ('nn -> lk', ['lk'])]
+    gaps = {name: [] for name, _ in methods}
+    seconds = 0
+    for _ in range(args.trials):
+        cities = frozenset(tsp_start.City(random.randrange(1000), random.randrange(1000)) for _ in range(args.n))
+        t0 = time.process_time()
+        optimal = tsp_start.tour_length(held_karp(cities))
+        seconds += time.process_time() - t0
+        nn = tsp_start.tour_nn(cities)
+        for name, pipeline in methods:
+            tour = tsp_start.improve(nn, pipeline) if pipeline else nn
+            gaps[name].append((tsp_start.tour_length(tour) - optimal) / optimal * 100)
+
+    print('{} instances of {} cities, Held-Karp in {:.3f} secs per instance'.format(args.trials, args.n, seconds / args.trials))
+    for name, values in gaps.items():
+        print('{:30} average gap {:5.2f}%, worst {:5.2f}%'.format(name, sum(values) / len(values), max(values)))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+import heapq
+import math
+
+# Uniform grid (bucket) index over the cities for nearest neighbour queries.
+#
+# The bounding box of the cities is divided in square buckets of about PER_BUCKET
+# cities. A query scans the buckets in rings around the bucket of the query point and
+# stops as soon as the next ring can't hold anything closer than the best so far, so a
+# query looks at a few buckets instead of all cities. Cities can be removed, which
+# makes it suitable for building a nearest neighbour tour in about O(n) time.
+
+PER_BUCKET = 2
+
+class GridIndex:
+    def __init__(self, points, per_bucket=PER_BUCKET):
+        # points is a list of (x, y) tuples (e.g. City), queries return indices in it
+        self.xs = [p[0] for p in points]
+        self.ys = [p[1] for p in points]
+        n = len(points)
+        self.x0 = min(self.xs, default=0)
+        self.y0 = min(self.ys, default=0)
+        width = max(self.xs, default=0) - self.x0
+        height = max(self.ys, default=0) - self.y0
+        self.size = max(math.sqrt(width * height * per_bucket / max(n, 1)), width / 1000, height / 1000, 1e-9)
+        self.cols = int(width / self.size) + 1
+        self.rows = int(height / self.size) + 1
+        self.buckets = [[] for _ in range(self.cols * self.rows)]
+        for i in range(n):
+            self.buckets[self.bucket(self.xs[i], self.ys[i])].append(i)
+        self.count = n
+
+    def __len__(self):
+        return self.count
+
+    def cell(self, x, y):
+        cx = min(max(int((x - self.x0) / self.size), 0), self.cols - 1)
+        cy = min(max(int((y - self.y0) / self.size), 0), self.rows - 1)
+        return cx, cy
+
+    def bucket(self, x, y):
+        cx, cy = self.cell(x, y)
+        return cy * self.cols + cx
+
+    def remove(self, i):
+        self.buckets[self.bucket(self.xs[i], self.ys[i])].remove(i)
+        self.count -= 1
+
+    def ring(self, cx, cy, r):
+        # the buckets at Chebyshev distance r of bucket (cx, cy), clipped to the grid
+        if r == 0:
+            yield self.buckets[cy * self.cols + cx]
+            return
+        left, right = max(cx - r, 0), min(cx + r, self.cols - 1)
+        for y in (cy - r, cy + r):
+            if 0 <= y < self.rows:
+                for x in range(left, right + 1):
+                    yield self.buckets[y * self.cols + x]
+        for x in (cx - r, cx + r):
+            if 0 <= x < self.cols:
+                for y in range(max(cy - r + 1, 0), min(cy + r, self.rows)):
+                    yield self.buckets[y * self.cols + x]
+
+    def nearest(self, x, y):
+        # index of the remaining point closest to (x, y), None if the index is empty
+        if self.count == 0:
+            return None
+        xs, ys = self.xs, self.ys
+        cx, cy = self.cell(x, y)
+        # distance from (x, y) to the sides of its own bucket
+        dx0 = x - self.x0 - cx * self.size
+        dy0 = y - self.y0 - cy * self.size
+        last = max(cx, cy, self.cols - 1 - cx, self.rows - 1 - cy)
+        best, best_d = None, math.inf
+        for r in range(last + 1):
+            for bucket in self.ring(cx, cy, r):
+                for i in bucket:
+                    d = (xs[i] - x) ** 2 + (ys[i] - y) ** 2
+                    if d < best_d:
+                        best, best_d = i, d
+            # every point outside rings 0..r is at least this far away
+            reach = min(dx0, self.size - dx0, dy0, self.size - dy0) + r * self.size
+            if best is not None and best_d <= reach * reach:
+                break
+        return best
+
+    def k_nearest(self, x, y, k, skip=None):
+        # indices of the k remaining points closest to (x, y), nearest first; skip is an
+        # index to leave out (e.g. the point at (x, y) itself)
+        xs, ys = self.xs, self.ys
+        cx, cy = self.cell(x, y)
+        dx0 = x - self.x0 - cx * self.size
+        dy0 = y - self.y0 - cy * self.size
+        last = max(cx, cy, self.cols - 1 - cx, self.rows - 1 - cy)
+        found = [] # max heap of (-distance, index) of the k nearest so far
+        for r in range(last + 1):
+            for bucket in self.ring(cx, cy, r):
+                for i in bucket:
+                    if i == skip:
+                        continue
+                    d = (xs[i] - x) ** 2 + (ys[i] - y) ** 2
+                    if len(found) < k:
+                        heapq.heappush(found, (-d, i))
+                    elif d < -found[0][0]:
+                        heapq.heapreplace(found, (-d, i))
+            reach = min(dx0, self.size - dx0, dy0, self.size - dy0) + r * self.size
+            if len(found) == k and -found[0][0] <= reach * reach:
+                break
+        return [i for _, i in sorted(found, reverse=True)]
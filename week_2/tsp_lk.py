@@ -0,0 +1,38 @@
+import argparse
+import random
+import tsp_start
+from tsp_local import Tour, K, DEPTH, local_search
+
+# Lin-Kernighan style variable depth improver: the 'lk' moves of tsp_local (see there
+# for how a move is built) in a local search of their own, with a command line demo.
+
+def lin_kernighan(tour, depth=DEPTH, time_limit=None, k=K, verbose=False):
+    """Improves a tour (list of cities) with Lin-Kernighan moves of at most depth steps
+       on the k nearest neighbours of every city, until no move improves the tour or
+       time_limit seconds have passed. Returns the new tour, its length and the list of
+       tsp_local.Pass statistics of every iteration (pass over the queue).
+    """
+    t = Tour(tour, k)
+    passes = local_search(t, 'lk', verbose, time_limit, depth=depth)
+    return t.tour(), t.length(), passes
+
+def main():
+    parser = argparse.ArgumentParser(description='Lin-Kernighan on random cities, starting from a nearest neighbour tour')
+    parser.add_argument('n', type=int, help='nr of cities')
+    parser.add_argument('--depth', type=int, default=DEPTH, help='maximum nr of steps in a move (default {})'.format(DEPTH))
+    parser.add_argument('--time', type=float, help='time budget in seconds')
+    parser.add_argument('--k', type=int, default=K, help='nr of candidate neighbours (default {})'.format(K))
+    parser.add_argument('--seed', type=int, help='seed of the random cities')
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    cities = frozenset(tsp_start.City(random.randrange(10 * args.n), random.randrange(10 * args.n)) for _ in range(args.n))
+    tour = tsp_start.tour_nn(cities)
+    length = tsp_start.tour_length(tour)
+    print('{} city nearest neighbour tour with length {:.1f}'.format(len(tour), length))
+    tour, lk_length, passes = lin_kernighan(tour, args.depth, args.time, args.k, verbose=True)
+    print('length {:.1f} after {} LK iterations in {:.2f} secs, {:.2f}% shorter'.format(
+          lk_length, len(passes), sum(p.seconds for p in passes), 100 * (length - lk_length) / length))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,283 @@
+import math
+import time
+from collections import deque, namedtuple
+import numpy as np
+from tsp_index import GridIndex
+
+# Local search for the TSP on candidate neighbour lists.
+#
+# Instead of testing every pair of edges, a move from city a only considers the K
+# nearest neighbours c of a as the new neighbour of a. A move can only gain if the new
+# edge (a, c) is shorter than the edge of a it replaces, and the neighbours are sorted
+# by distance, so the scan over them stops at the first one that is too far away. The
+# gain of a move is computed directly from the 4 (or 6) edge lengths involved, O(1).
+#
+# Don't look bits: the cities to try are kept in a queue. A city that gives no
+# improving move is not tried again until one of its tour neighbours changes by a move.
+# The search ends when the queue is empty, the tour is then locally optimal for the
+# operator with respect to the candidate lists.
+#
+# Operators:
+#   2-opt     replace two edges by two others, reversing the path between them
+#   or-opt    move a chain of 1 to 3 cities to another place in the tour, possibly
+#             reversed (a special 3-opt move)
+#   or-2opt   both of the above for every city
+#   lk        Lin-Kernighan style variable depth moves, a chain of 2-opt steps (see below)
+
+K = 8               # nr of candidate neighbours per city
+OR_LENGTH = 3       # longest chain of cities moved by or-opt
+EPS = 1e-9          # minimal gain of a move, guards against rounding errors
+DEPTH = 10          # maximum nr of 2-opt steps in an lk move
+BREADTH = (5, 3)    # nr of candidates tried at the first levels of an lk move, 1 after that
+
+# statistics of one pass over the queue
+Pass = namedtuple('Pass', 'operator number moves gain length seconds')
+
+class Tour:
+    # a tour as an array of city indices (order) with the position of every city (pos),
+    # which gives the successor and predecessor of a city in O(1); both are NumPy arrays
+    # so reversing a segment of the tour is a vectorized copy
+    def __init__(self, cities, k=K):
+        self.cities = list(cities)
+        self.xs = [c[0] for c in self.cities]
+        self.ys = [c[1] for c in self.cities]
+        self.n = len(self.cities)
+        self.order = np.arange(self.n)
+        self.pos = np.arange(self.n)
+        index = GridIndex(self.cities)
+        self.neighbours = [index.k_nearest(self.xs[i], self.ys[i], k, skip=i) for i in range(self.n)]
+
+    def dist(self, a, b):
+        return math.hypot(self.xs[a] - self.xs[b], self.ys[a] - self.ys[b])
+
+    def succ(self, a):
+        return int(self.order[(self.pos[a] + 1) % self.n])
+
+    def pred(self, a):
+        return int(self.order[self.pos[a] - 1])
+
+    def length(self):
+        xs, ys = np.array(self.xs, dtype=float)[self.order], np.array(self.ys, dtype=float)[self.order]
+        return float(np.hypot(xs - np.roll(xs, 1), ys - np.roll(ys, 1)).sum())
+
+    def tour(self):
+        # the tour as a list of cities
+        return [self.cities[i] for i in self.order.tolist()]
+
+    def reverse(self, a, b):
+        # reverse the path from city a forward to city b; the tour is a cycle, so when
+        # that path is longer than half the tour the rest of the tour is reversed instead
+        n, order, pos = self.n, self.order, self.pos
+        i, j = pos[a], pos[b]
+        m = (j - i) % n + 1
+        if 2 * m > n:
+            i, j = (j + 1) % n, (i - 1) % n
+            m = n - m
+        if m < 2:
+            return
+        positions = np.arange(i, i + m) % n if i + m > n else slice(i, i + m)
+        segment = order[positions][::-1].copy()
+        order[positions] = segment
+        pos[segment] = np.arange(i, i + m) % n
+
+    def exchange(self, a, b, c, d):
+        # the 2-opt move: replace the edges (a, b) and (c, d) by (a, c) and (b, d), where b
+        # follows a and d follows c in the same direction
+        if self.succ(a) == b:
+            self.reverse(b, c)
+        else:
+            self.reverse(a, d)
+
+def two_opt_move(t, a):
+    # try to find an improving 2-opt move that gives a a new neighbour; makes the first
+    # one found and returns its gain and the cities whose tour neighbours changed, or None
+    dist = t.dist
+    for succ in (t.succ, t.pred):
+        b = succ(a)
+        d_ab = dist(a, b)
+        for c in t.neighbours[a]:
+            g1 = d_ab - dist(a, c)
+            if g1 <= EPS:
+                break
+            d = succ(c)
+            if c == b or d == a:
+                continue
+            # replace edges (a, b) and (c, d) by (a, c) and (b, d)
+            gain = g1 + dist(c, d) - dist(b, d)
+            if gain > EPS:
+                t.exchange(a, b, c, d)
+                return gain, (a, b, c, d)
+    return None
+
+def or_opt_move(t, a):
+    # try to move a chain of 1 to OR_LENGTH cities starting at a (in both directions)
+    # between two other cities, next to a candidate neighbour of one of its ends; the
+    # chain may be inserted reversed. Returns the gain and the changed cities, or None.
+    if t.n < 8:
+        return None
+    dist = t.dist
+    for succ, pred in ((t.succ, t.pred), (t.pred, t.succ)):
+        p = pred(a)
+        chain = [a]
+        while len(chain) <= OR_LENGTH:
+            s1, s2 = chain[0], chain[-1]
+            nx = succ(s2)
+            # gain of taking the chain out: edges (p, s1) and (s2, nx) become (p, nx)
+            g1 = dist(p, s1) + dist(s2, nx) - dist(p, nx)
+            for s, other in ((s1, s2), (s2, s1)):
+                for c in t.neighbours[s]:
+                    d_sc = dist(s, c)
+                    if d_sc >= g1 - EPS:
+                        break
+                    if c in chain:
+                        continue
+                    # insert in the edge after or before c, with s next to c
+                    for u, v in ((c, succ(c)), (pred(c), c)):
+                        if u in chain or v in chain:
+                            continue
+                        if c == u:
+                            first, last = s, other
+                            gain = g1 - d_sc - dist(other, v) + dist(u, v)
+                        else:
+                            first, last = other, s
+                            gain = g1 - dist(u, other) - d_sc + dist(u, v)
+                        if gain > EPS:
+                            or_move(t, p, s1, s2, nx, u, v, first)
+                            return gain, (p, s1, s2, nx, u, v)
+            chain.append(nx)
+    return None
+
+def or_move(t, p, s1, s2, nx, u, v, first):
+    # move the chain s1..s2 (p before it, nx after it) into the edge (u, v), which has the
+    # same direction, so that it becomes u first .. v; done as two or three 2-opt moves
+    if v == p:
+        # the same move seen in the other direction, where u is the city after the chain
+        first = s1 if first == s2 else s2
+        p, nx, s1, s2, u, v = nx, p, s2, s1, v, u
+    t.exchange(p, s1, u, v)       # p u .. nx s2 .. s1 v
+    if u != nx:
+        t.exchange(p, u, nx, s2)  # p nx .. u s2 .. s1 v
+    if first != s2:
+        t.exchange(u, s2, s1, v)  # u s1 .. s2 v
+
+def or_2opt_move(t, a):
+    # the 2-opt and or-opt moves together, a restricted 3-opt neighbourhood
+    return two_opt_move(t, a) or or_opt_move(t, a)
+
+# Lin-Kernighan style variable depth moves (lk).
+#
+# A move starts at a city t1 and its tour neighbour t2 and is built as a chain of 2-opt
+# steps. Every step removes the edge (t1, t2) and an edge (t3, t4), where t3 is a
+# candidate neighbour of t2, and adds (t2, t3) and (t4, t1); the new loose end t4 is the
+# t2 of the next step. A step is only taken while the gain without the closing edge
+# (t4, t1) stays positive, which is what lets LK make temporarily worse tours on the way
+# to a better one. The candidate with the longest removed edge (t3, t4) is
+# tried first, and at the first levels the next candidates are tried (backtracking)
+# when a chain finds no improvement. Edges added by the chain are never removed again
+# and the chain ends after depth steps. The tour is left at the step with the best gain
+# of the chain, or rolled back completely when no step improved the tour.
+#
+# The moves run in the don't look bit queue of local_search, so a city is only tried
+# again when the tour around it changed.
+
+def edge(a, b):
+    return (a, b) if a < b else (b, a)
+
+def lk_move(t, t1, depth=DEPTH):
+    # one variable depth move from t1, returns its gain and the changed cities, or None
+    for t2 in (t.succ(t1), t.pred(t1)):
+        changed = []
+        gain = chain(t, t1, t2, 0, 0, depth, EPS, set(), changed)
+        if gain:
+            return gain, tuple(set(changed))
+    return None
+
+def chain(t, t1, t2, gain, level, depth, best, added, changed):
+    # Extend the chain with a step from the edge (t1, t2), the tour so far has the given
+    # gain. When a tour with a gain above best is found the tour is left in that state,
+    # its cities are added to changed and the gain is returned, else the tour is restored
+    # and 0 is returned. The first levels try more than one candidate (BREADTH).
+    if level == depth:
+        return 0
+    dist = t.dist
+    # t4 has to be on the same side of t3 as t1 is of t2 for the 2-opt step
+    forward = t.succ(t1) == t2
+    open_gain = gain + dist(t1, t2)
+    candidates = []
+    for t3 in t.neighbours[t2]:
+        g = open_gain - dist(t2, t3)
+        if g <= EPS:
+            break
+        if t3 == t1:
+            continue
+        t4 = t.pred(t3) if forward else t.succ(t3)
+        if t4 == t2 or edge(t3, t4) in added:
+            continue
+        # prefer the longest removed edge (t3, t4)
+        candidates.append((g + dist(t3, t4), t3, t4, g))
+    candidates.sort(reverse=True)
+
+    for _, t3, t4, g in candidates[:BREADTH[level] if level < len(BREADTH) else 1]:
+        t.exchange(t2, t1, t3, t4)
+        added.add(edge(t2, t3))
+        added.add(edge(t4, t1))
+        closed = g + dist(t3, t4) - dist(t4, t1)
+        deeper = chain(t, t1, t4, closed, level + 1, depth, max(best, closed), added, changed)
+        if deeper or closed > best:
+            changed.extend((t1, t2, t3, t4))
+            return deeper or closed
+        # (t2, t3) and (t1, t4) become (t2, t1) and (t3, t4) again
+        t.exchange(t2, t3, t1, t4)
+        added.discard(edge(t2, t3))
+        added.discard(edge(t4, t1))
+    return 0
+
+OPERATORS = {'2-opt': two_opt_move, 'or-opt': or_opt_move, 'or-2opt': or_2opt_move, 'lk': lk_move}
+
+def local_search(t, operator='2-opt', verbose=False, time_limit=None, **options):
+    """Improves Tour t with the operator until no city gives an improving move or the
+       time limit (in seconds) has passed, returns a list of Pass statistics. A pass goes
+       through the cities that were in the queue at its start; with verbose the
+       improvement of every pass is printed. Options are passed on to the operator.
+    """
+    move = OPERATORS[operator]
+    deadline = time.perf_counter() + time_limit if time_limit is not None else math.inf
+    queue = deque(t.order.tolist())
+    queued = bytearray([1]) * t.n
+    passes = []
+    length = t.length()
+    while queue and time.perf_counter() < deadline:
+        t0 = time.perf_counter()
+        moves = 0
+        gain = 0
+        for _ in range(len(queue)):
+            if time.perf_counter() >= deadline:
+                break
+            a = queue.popleft()
+            queued[a] = 0
+            result = move(t, a, **options)
+            if result is None:
+                continue
+            moves += 1
+            gain += result[0]
+            changed = result[1]
+            # the endpoints of the changed edges have to be looked at again
+            for city in changed:
+                if not queued[city]:
+                    queued[city] = 1
+                    queue.append(city)
+        length -= gain
+        passes.append(Pass(operator, len(passes) + 1, moves, gain, length, time.perf_counter() - t0))
+        if verbose:
+            p = passes[-1]
+            print('{} pass {}: {} moves, length {:.1f} ({:.2f}% shorter) in {:.3f} secs'.format(
+                  p.operator, p.number, p.moves, p.length, 100 * p.gain / (p.length + p.gain), p.seconds))
+    return passes
+
+def improve(tour, operators=('2-opt',), k=K, verbose=False):
+    # improve a tour (list of cities) with the operators one after the other, returns the
+    # new tour as a list of cities
+    t = Tour(tour, k)
+    for operator in operators:
+        local_search(t, operator, verbose)
+    return t.tour()
@@ -1,102 +1,55 @@
 import matplotlib.pyplot as plt
 import random
 import time
-import itertools
 import math
 from collections import namedtuple
+from tsp_index import GridIndex
+from tsp_local import improve
+from tsp_exact import held_karp
 
 # based on Peter Norvig's IPython Notebook on the TSP
 
 City = namedtuple('City', 'x y')
 
+# local search operators applied one after the other to a constructed tour, see
+# tsp_local.OPERATORS ('2-opt', 'or-opt', 'or-2opt' and the Lin-Kernighan moves 'lk')
+PIPELINE = ('2-opt', 'or-opt')
+
 def distance(A, B):
     return math.hypot(A.x - B.x, A.y - B.y)
 
-def orientation(p1, q1, p2):
-    return (q1.y-p1.y) * (p2.x-q1.x) > (q1.x-p1.x) * (p2.y-q1.y);
-
-def intersect(e1, e2):
-    o1 = orientation(e1[0], e1[1], e2[0])
-    o2 = orientation(e1[0], e1[1], e2[1])
-    o3 = orientation(e2[0], e2[1], e1[0])
-    o4 = orientation(e2[0], e2[1], e1[1])
-    return o1 != o2 and o3 != o4
-
 def try_all_tours(cities):
-    # generate and test all possible tours of the cities and choose the shortest tour
-    tours = alltours(cities)
-    return min(tours, key=tour_length)
-
-def alltours(cities):
-    # return a list of tours (a list of lists), each tour a permutation of cities,
-    # and each one starting with the same city
-    # note: cities is a set, sets don't support indexing
-    start = next(iter(cities)) 
-    return [[start] + list(rest) for rest in itertools.permutations(cities - {start})]
+    # the shortest tour of the cities, with the exact Held-Karp solver instead of
+    # generating and testing all tours (up to about 20 cities, see tsp_exact)
+    return held_karp(cities)
 
 def tour_nn(cities):
     # Return a tour (list of City tuples) found using the nearest neighbour strategy
-    # Time complexity: O((n^2 + n) / 2)
-    tour = []
+    # The remaining cities are kept in a bucket grid, so finding the nearest one only
+    # looks at the buckets around the current city and removing it is O(1).
+    # Time complexity: about O(n) for uniformly spread cities
     cities = list(cities)
-    curr = cities[0]
-    
-    while len(cities) > 0:
-        # Find nearest neighbouring city in list of remaining cities
-        nn = min((distance(city, curr), city) for city in cities)[1]
-        tour.append(nn)
+    index = GridIndex(cities)
+    tour = []
+    i = 0
 
-        # Remove city so it can't be visited again.
-        cities.remove(nn)
-        curr = nn
+    while i is not None:
+        curr = cities[i]
+        tour.append(curr)
 
-    return tour
+        # Remove city so it can't be visited again, then find the nearest remaining city
+        index.remove(i)
+        i = index.nearest(curr.x, curr.y)
 
-def two_opt(tour):
-    # Improve a tour by removing all intersections using a 2-opt approach
-    # Time complexity: O(n^3)
-
-    tour = tour.copy()
-
-    intersect_remaining = True
-    no_intersect_count = 0
-    counter = 0
-    while intersect_remaining:
-        # Use iteration counter as a pointer to the first position of edge 1
-        counter += 1
-        p1 = counter % (len(tour)-2)
-
-        # If there are no intersections remaining the algorithm is finished
-        if no_intersect_count > len(tour):
-            intersect_remaining = False
-
-        intersect_found = False
-        for p2 in range(p1+2, len(tour)):
-            edge1 = (tour[p1], tour[p1+1])
-
-            # q2 can be 0 to include the last edge which has the origin/first position in
-            #  the tour list.
-            if p2 == len(tour)-1:
-                if p1 != 0:
-                    q2 = 0
-                else: continue
-            else:
-                q2 = p2 + 1
-
-            edge2 = (tour[p2], tour[q2])
-
-            if intersect(edge1, edge2):
-                # If intersection is found, switch the edges. All the nodes inbetween have
-                #  to be reversed
-                tour[p1+1:p2+1] = tour[p1+1:p2+1][::-1]
-                intersect_found = True
-        
-        # Keep track of iterations since a intersection has been encountered
-        if not intersect_found: no_intersect_count += 1
-        else: no_intersect_count = 0
-    
     return tour
 
+def two_opt(tour, verbose=False):
+    # Improve a tour with 2-opt moves on the nearest neighbours of every city, see tsp_local
+    # Only moves that make the tour shorter are made (which includes removing every
+    # crossing between a city and its neighbours). With verbose the improvement of every
+    # pass is printed.
+    return improve(tour, ['2-opt'], verbose=verbose)
+
 def tour_length(tour):
     # the total of distances between each pair of consecutive cities in the tour
     return sum(distance(tour[i], tour[i-1]) for i in range(len(tour)))
@@ -118,20 +71,21 @@ def plot_tour(tour):
     plt.axis('off')
     plt.show()
 
-def plot_tsp(algorithm, cities):
-    # apply a TSP algorithm to cities, print the time it took, and plot the resulting tour.
+def plot_tsp(algorithm, cities, pipeline=PIPELINE):
+    # apply a TSP algorithm to cities, improve the tour with the local search operators in
+    # pipeline, print the time it took, and plot the resulting tour.
     t0 = time.process_time()
     tour = algorithm(cities)
     tl = tour_length(tour)
-    tour = two_opt(tour)
+    tour = improve(tour, pipeline)
     t1 = time.process_time()
-    print('nn: {:.1f}'.format(tl))
-    print("{} city tour with length {:.1f} in {:.3f} secs for {}"
-          .format(len(tour), tour_length(tour), t1 - t0, algorithm.__name__))
+    print('{}: {:.1f}'.format(algorithm.__name__, tl))
+    print("{} city tour with length {:.1f} in {:.3f} secs for {} -> {}"
+          .format(len(tour), tour_length(tour), t1 - t0, algorithm.__name__, ' -> '.join(pipeline)))
     print("Start plotting ...")
     plot_tour(tour)
 
-def test(n):
+def test(n, pipeline=PIPELINE):
     deltas = []
     count = 0
 
@@ -145,23 +99,26 @@ def test(n):
             .format(len(tour), l1, t1 - t0))
         
         t0 = time.process_time()
-        tour = two_opt(tour)
+        tour = improve(tour, pipeline, verbose=True)
         t1 = time.process_time()
         l2 = tour_length(tour)
-        print("length {:.1f} in {:.3f} secs after optimising tour with 2-opt"
-            .format(l2, t1-t0))
+        print("length {:.1f} in {:.3f} secs after optimising tour with {}"
+            .format(l2, t1-t0, ' -> '.join(pipeline)))
 
         delta = (l2 - l1) / l1 * 100
-        print('2-opt difference with normal nn: {:.1f}'.format(delta))
+        print('local search difference with normal nn: {:.1f}'.format(delta))
 
         deltas.append(delta)
         count += 1
         print('Average delta: {:.1f}'.format(sum(deltas) / count))
 
-# give a demo with 10 cities using brute force
-# plot_tsp(try_all_tours, make_cities(10))
-# plot_tsp(tour_nn, make_cities(500))
-test(500)
+if __name__ == '__main__':
+    # give a demo with 10 cities using the exact Held-Karp solver (up to about 20 cities)
+    # plot_tsp(try_all_tours, make_cities(10))
+    # plot_tsp(tour_nn, make_cities(500))
+    # plot_tsp(tour_nn, make_cities(500), pipeline=['or-2opt'])
+    # plot_tsp(tour_nn, make_cities(500), pipeline=['lk', 'or-opt'])
+    test(500)
 
 # a) Hoeveel procent ligt het resultaat van NN af van de optimale route? Uit onze tests blijkt dat bij 10 steden het verschil
 #     ongeveer 10% is gemiddeld.